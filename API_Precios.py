@@ -0,0 +1,289 @@
+import os
+import json
+import math
+import time
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import pandas as pd
+
+import Price_Store
+import Metricas
+from Categorias import CATEGORIAS, CATEGORIA_DEFECTO
+
+# --- API de consultas sobre el histórico de precios (HTTP/JSON, solo lectura) ---
+# Un solo proceso mantiene en memoria el formato largo de cada categoría ordenado por
+# (producto, fecha) y por (supermercado, fecha); todos los clientes comparten esa copia.
+#   GET /categorias
+#   GET /ultimos?categoria=&producto=&supermercado=                último precio de cada producto/supermercado
+#   GET /serie?categoria=&producto=&supermercado=&desde=&hasta=    serie de precios (producto o supermercado)
+#   GET /diferencias?categoria=&fecha=&producto=                   diferencia entre supermercados en un día
+# Las listas se paginan con pagina/por_pagina y llevan ETag (versión de los archivos del almacén):
+# con If-None-Match igual se responde 304 sin consultar nada.
+# En memoria quedan los últimos MESES_EN_MEMORIA meses; lo anterior se lee del almacén con los filtros
+# aplicados en la lectura: una /serie o /diferencias de fechas viejas, y los /ultimos de productos que
+# no aparecen dentro de la ventana (se calculan una vez por versión de los datos).
+HOST = "127.0.0.1"
+PUERTO = 8766
+POR_PAGINA = 100
+MAX_POR_PAGINA = 1000
+REFRESCO = 5  # segundos entre chequeos de cambios en el almacén
+MESES_EN_MEMORIA = 13
+
+_DATOS = {}  # categoria -> datos indexados de la última versión
+_LOCK = threading.Lock()
+
+
+def _desde_en_memoria(firmas):
+    # Primer día del rango en memoria según los meses de las particiones; None si entra toda la historia
+    meses = sorted({os.path.basename(os.path.dirname(os.path.dirname(ruta))).split("=", 1)[1] for ruta in firmas})
+    if len(meses) <= MESES_EN_MEMORIA:
+        return None
+    return pd.Timestamp(meses[-MESES_EN_MEMORIA] + "-01")
+
+
+def indexar(categoria, df, firmas, desde=None):
+    # Tres órdenes del mismo formato largo: cada consulta es un corte por búsqueda binaria.
+    # Los datos de una versión no se modifican: al cambiar el almacén se arma otro diccionario.
+    df = df[['fecha', 'supermercado', 'producto', 'precio']].copy()
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    por_producto = df.sort_values(['producto', 'fecha', 'supermercado'], ignore_index=True)
+    ultimos = por_producto.drop_duplicates(['producto', 'supermercado'], keep='last')
+    return {
+        "categoria": categoria,
+        "firmas": firmas,
+        "version": hashlib.sha1(json.dumps(sorted(firmas.items())).encode("utf-8")).hexdigest()[:16],
+        "chequeo": time.monotonic(),
+        "desde": desde,  # lo anterior se lee del almacén a pedido
+        "por_fecha": df.sort_values(['fecha', 'producto', 'supermercado'], ignore_index=True),
+        "por_producto": por_producto,
+        "por_supermercado": df.sort_values(['supermercado', 'fecha', 'producto'], ignore_index=True),
+        "ultimos": ultimos.sort_values(['producto', 'supermercado'], ignore_index=True),
+        "ultimos_completos": None,  # con lo anterior a `desde`, se arma a pedido
+        "diferencias": {},  # fecha -> tabla, se arma a pedido
+    }
+
+
+def datos(categoria):
+    # Relee la categoría solo si cambiaron sus particiones (se chequea cada REFRESCO segundos)
+    with _LOCK:
+        actuales = _DATOS.get(categoria)
+        if actuales is not None and time.monotonic() - actuales["chequeo"] < REFRESCO:
+            return actuales
+        firmas = Price_Store.archivos(categoria)
+        if actuales is not None and firmas == actuales["firmas"]:
+            actuales["chequeo"] = time.monotonic()
+            return actuales
+        desde = _desde_en_memoria(firmas)
+        with Metricas.medir("api", "carga", categoria=categoria, particiones=len(firmas)):
+            _DATOS[categoria] = indexar(categoria, Price_Store.leer(categoria, desde=desde), firmas, desde)
+        return _DATOS[categoria]
+
+
+# --- Consultas ---
+def _rango(df, columna, valor):
+    # Filas con `valor` en una columna por la que df está ordenado
+    valores = df[columna]
+    return df.iloc[valores.searchsorted(valor, side='left'):valores.searchsorted(valor, side='right')]
+
+
+def _entre_fechas(df, desde, hasta):
+    # df ordenado por fecha (dentro de un corte por producto o supermercado)
+    fechas = df['fecha']
+    inicio = fechas.searchsorted(desde, side='left') if desde is not None else 0
+    fin = fechas.searchsorted(hasta, side='right') if hasta is not None else len(df)
+    return df.iloc[inicio:fin]
+
+
+def _fecha(parametros, nombre):
+    valor = parametros.get(nombre)
+    return pd.Timestamp(valor) if valor else None
+
+
+def _ultimos(d):
+    # Último precio de cada producto/supermercado en toda la historia, no solo en la ventana en memoria
+    if d["desde"] is None:
+        return d["ultimos"]
+    if d["ultimos_completos"] is None:
+        anteriores = Price_Store.leer(d["categoria"], hasta=d["desde"] - pd.Timedelta(days=1))
+        anteriores = anteriores[['fecha', 'supermercado', 'producto', 'precio']]
+        anteriores = anteriores.sort_values(['producto', 'fecha', 'supermercado']).drop_duplicates(['producto', 'supermercado'], keep='last')
+        todos = pd.concat([anteriores, d["ultimos"]], ignore_index=True)
+        todos = todos.drop_duplicates(['producto', 'supermercado'], keep='last')  # la ventana manda
+        d["ultimos_completos"] = todos.sort_values(['producto', 'supermercado'], ignore_index=True)
+    return d["ultimos_completos"]
+
+
+def ultimos(d, parametros):
+    df = _ultimos(d)
+    if parametros.get("producto"):
+        df = _rango(df, 'producto', parametros["producto"])
+    if parametros.get("supermercado"):
+        df = df[df['supermercado'] == parametros["supermercado"]]
+    return df
+
+
+def serie(d, parametros):
+    producto, supermercado = parametros.get("producto"), parametros.get("supermercado")
+    desde, hasta = _fecha(parametros, "desde"), _fecha(parametros, "hasta")
+    if not producto and not supermercado:
+        raise ValueError("/serie necesita producto o supermercado")
+    if d["desde"] is not None and (desde is None or desde < d["desde"]):
+        # Fuera de la memoria: solo se leen las particiones y row groups que pueden coincidir
+        df = Price_Store.leer(d["categoria"], desde=desde, hasta=hasta,
+                              productos=[producto] if producto else None,
+                              supermercados=[supermercado] if supermercado else None)
+        return df[['fecha', 'supermercado', 'producto', 'precio']]
+    if producto:
+        df = _entre_fechas(_rango(d["por_producto"], 'producto', producto), desde, hasta)
+        if supermercado:
+            df = df[df['supermercado'] == supermercado]
+        return df
+    return _entre_fechas(_rango(d["por_supermercado"], 'supermercado', supermercado), desde, hasta)
+
+
+def diferencias(d, parametros):
+    # Mínimo y máximo entre supermercados de cada producto en una fecha (por defecto, la última)
+    por_fecha = d["por_fecha"]
+    if por_fecha.empty:
+        return por_fecha[['producto', 'fecha']]  # sin datos: vacío, con fecha datetime como el resto
+    fecha = _fecha(parametros, "fecha") or por_fecha['fecha'].iloc[-1]
+
+    tabla = d["diferencias"].get(fecha)
+    if tabla is None:
+        if d["desde"] is not None and fecha < d["desde"]:
+            # Fuera de la memoria: se lee solo ese día del almacén
+            dia = Price_Store.leer(d["categoria"], desde=fecha, hasta=fecha)
+            dia = dia.sort_values(['fecha', 'producto', 'supermercado'], ignore_index=True)
+        else:
+            dia = _rango(por_fecha, 'fecha', fecha)
+        precios = dia.groupby('producto')['precio']
+        tabla = pd.DataFrame({
+            "supermercados": precios.size(),
+            "minimo": precios.min(),
+            "maximo": precios.max(),
+            "mas_barato": dia.loc[precios.idxmin(), 'supermercado'].to_numpy(),
+            "mas_caro": dia.loc[precios.idxmax(), 'supermercado'].to_numpy(),
+        })
+        tabla = tabla[(tabla['supermercados'] >= 2) & (tabla['minimo'] > 0)]
+        tabla['diferencia'] = tabla['maximo'] - tabla['minimo']
+        tabla['porcentaje'] = (tabla['maximo'] / tabla['minimo'] - 1).round(4)
+        tabla = tabla.reset_index().assign(fecha=fecha)
+        tabla = tabla.sort_values(['porcentaje', 'producto'], ascending=[False, True], ignore_index=True)
+        d["diferencias"][fecha] = tabla
+
+    if parametros.get("producto"):
+        tabla = tabla[tabla['producto'] == parametros["producto"]]
+    return tabla
+
+
+CONSULTAS = {
+    "/ultimos": ultimos,
+    "/serie": serie,
+    "/diferencias": diferencias,
+}
+
+
+def _entero(parametros, nombre, defecto):
+    valor = parametros.get(nombre)
+    if not valor:
+        return defecto
+    if not valor.isdigit() or int(valor) < 1:
+        raise ValueError(f"{nombre} debe ser un entero positivo")
+    return int(valor)
+
+
+def paginar(df, pagina, por_pagina):
+    parte = df.iloc[(pagina - 1) * por_pagina:pagina * por_pagina]
+    if 'fecha' in parte.columns and pd.api.types.is_datetime64_any_dtype(parte['fecha']):
+        parte = parte.assign(fecha=parte['fecha'].dt.strftime('%Y-%m-%d'))
+    return {
+        "total": len(df),
+        "pagina": pagina,
+        "por_pagina": por_pagina,
+        "paginas": math.ceil(len(df) / por_pagina),
+        "datos": parte.to_dict("records"),
+    }
+
+
+def responder(ruta, parametros, if_none_match=None):
+    # Devuelve (código, cuerpo o None, etag o None)
+    if ruta == "/categorias":
+        return 200, {"categorias": [c for c in CATEGORIAS if c in Price_Store.categorias()]}, None
+
+    consulta = CONSULTAS.get(ruta)
+    if consulta is None:
+        return 404, {"error": f"rutas disponibles: /categorias, {', '.join(CONSULTAS)}"}, None
+
+    categoria = parametros.get("categoria") or CATEGORIA_DEFECTO
+    if categoria not in CATEGORIAS:
+        raise ValueError(f"categoría desconocida: {categoria}")
+    pagina = _entero(parametros, "pagina", 1)
+    por_pagina = min(_entero(parametros, "por_pagina", POR_PAGINA), MAX_POR_PAGINA)
+
+    d = datos(categoria)
+    # La respuesta depende solo de la URL y de la versión de los datos
+    etag = f'"{d["version"]}"'
+    if if_none_match and etag in [e.strip() for e in if_none_match.split(",")]:
+        return 304, None, etag
+
+    with Metricas.medir("api", ruta.strip("/"), categoria=categoria):
+        cuerpo = paginar(consulta(d, parametros), pagina, por_pagina)
+    return 200, cuerpo, etag
+
+
+class Manejador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        partes = urlsplit(self.path)
+        parametros = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+        try:
+            codigo, cuerpo, etag = responder(partes.path, parametros, self.headers.get("If-None-Match"))
+        except ValueError as e:
+            codigo, cuerpo, etag = 400, {"error": str(e)}, None
+        except Exception as e:
+            # Cualquier otra falla responde JSON igual: el cliente nunca se queda sin respuesta
+            print(f"❌ API {self.path}: {e!r}")
+            codigo, cuerpo, etag = 500, {"error": "error interno"}, None
+
+        self.send_response(codigo)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")  # el cliente revalida siempre con el ETag
+        if cuerpo is None:
+            self.end_headers()
+            return
+        datos_json = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos_json)))
+        self.end_headers()
+        self.wfile.write(datos_json)
+        Metricas.volcar()
+
+    def log_message(self, formato, *args):
+        pass  # sin una línea por pedido; los tiempos quedan en Metricas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API HTTP/JSON de consultas sobre el histórico de precios.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    parser.add_argument("--precargar", action="store_true", help="Carga todas las categorías con datos antes de atender")
+    args = parser.parse_args()
+
+    if args.precargar:
+        for clave in Price_Store.categorias():
+            datos(clave)
+            print(f"📦 {clave} cargada")
+
+    servidor = ThreadingHTTPServer((args.host, args.puerto), Manejador)
+    print(f"🌐 API de precios en http://{args.host}:{args.puerto}/categorias")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("👋 API detenida")
+    finally:
+        servidor.server_close()
+        Metricas.volcar()
@@ -0,0 +1,253 @@
+import os
+import json
+import math
+import argparse
+from datetime import datetime
+
+import pandas as pd
+import requests
+
+import Price_Store
+import Metricas
+from Categorias import CATEGORIAS, CATEGORIA_DEFECTO
+
+# --- Motor de alertas de precios ---
+# Consume los días nuevos que deja Names_Unification (formato largo) y mantiene en memoria, por
+# producto y supermercado, el último precio y una media/varianza exponencial (O(1) por registro,
+# sin releer la historia). Emite eventos a Data/Alertas/eventos.jsonl y, si hay, a un webhook:
+#   salto_precio       el precio cambió más de UMBRAL_SALTO contra el último conocido
+#   nuevo_mas_barato   otro supermercado pasó a tener el precio más bajo del producto
+#   desaparecido       el supermercado publicó ese día pero el producto ya no está
+ALERTAS_PATH = os.path.join("Data", "Alertas")
+EVENTOS_ARCHIVO = "eventos.jsonl"
+WEBHOOK_URL = os.environ.get("ALERTAS_WEBHOOK")
+
+UMBRAL_SALTO = 0.10
+ALFA = 2 / (30 + 1)  # media exponencial equivalente a ~30 observaciones
+
+# Estado por categoría, cargado una vez por proceso (el recolector lo mantiene entre corridas)
+_ESTADOS = {}
+
+
+def ruta_estado(categoria):
+    return os.path.join(ALERTAS_PATH, categoria, "estado.json")
+
+
+def nuevo_estado():
+    return {
+        "ultima_fecha": None,
+        "series": {},       # "producto|supermercado" -> {"fecha", "actual": [...], "base": [...]}
+        "precios": {},      # producto -> {supermercado: último precio conocido}
+        "mas_barato": {},   # producto -> {"fecha", "supermercado", "anterior"}
+        "presentes": {},    # supermercado -> {"fecha", "productos", "anteriores"}
+        "emitidos": {"fecha": None, "claves": []},
+    }
+
+
+def cargar(categoria):
+    if categoria not in _ESTADOS:
+        if os.path.exists(ruta_estado(categoria)):
+            with open(ruta_estado(categoria), encoding="utf-8") as f:
+                _ESTADOS[categoria] = json.load(f)
+        else:
+            _ESTADOS[categoria] = None
+    return _ESTADOS[categoria]
+
+
+def guardar(categoria, estado):
+    _ESTADOS[categoria] = estado
+    os.makedirs(os.path.dirname(ruta_estado(categoria)), exist_ok=True)
+    tmp_path = ruta_estado(categoria) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(estado, f, ensure_ascii=False)
+    os.replace(tmp_path, ruta_estado(categoria))
+
+
+# --- Estadísticas de cada serie: [precio, media, varianza, n] ---
+# "base" es el estado antes de la última fecha: si la misma fecha llega de nuevo (varias corridas
+# por día) se reaplica sobre la base en lugar de contar dos veces el mismo día.
+def _actualizar(stats, precio):
+    anterior, media, varianza, n = stats
+    if n == 0:
+        return [precio, precio, 0.0, 1]
+    diferencia = precio - media
+    incremento = ALFA * diferencia
+    return [precio, media + incremento, (1 - ALFA) * (varianza + diferencia * incremento), n + 1]
+
+
+def _observar(serie, fecha, precio):
+    # Devuelve la base contra la que se compara esta observación, o None si la fecha es vieja
+    if serie["fecha"] is not None and fecha < serie["fecha"]:
+        return None
+    if fecha != serie["fecha"]:
+        serie["base"] = serie["actual"]
+        serie["fecha"] = fecha
+    serie["actual"] = _actualizar(serie["base"], precio)
+    return serie["base"]
+
+
+def _evento(tipo, categoria, fecha, producto, supermercado, **detalle):
+    return {
+        "ts": datetime.now().isoformat(timespec="seconds"),
+        "tipo": tipo,
+        "categoria": categoria,
+        "fecha": fecha,
+        "producto": producto,
+        "supermercado": supermercado,
+        **detalle,
+    }
+
+
+def eventos_del_dia(estado, categoria, fecha, df):
+    # df: formato largo de una fecha (supermercado, producto, precio), un precio por par.
+    # Con el recolector una fecha llega por partes (se reunifica al llegar cada tienda): lo que no
+    # depende de una sola tienda se calcula sobre el último precio conocido de cada supermercado.
+    eventos = []
+    precios = estado.setdefault("precios", {})
+
+    for supermercado, producto, precio in df[['supermercado', 'producto', 'precio']].itertuples(index=False):
+        serie = estado["series"].setdefault(f"{producto}|{supermercado}", {"fecha": None, "actual": [None, 0.0, 0.0, 0], "base": [None, 0.0, 0.0, 0]})
+        base = _observar(serie, fecha, float(precio))
+        if base is None:
+            continue  # fecha vieja
+        precios.setdefault(producto, {})[supermercado] = float(precio)
+        if not base[0]:
+            continue  # primera observación de la serie
+        variacion = precio / base[0] - 1
+        if abs(variacion) >= UMBRAL_SALTO:
+            z = (precio - base[1]) / math.sqrt(base[2]) if base[2] > 0 else None
+            eventos.append(_evento("salto_precio", categoria, fecha, producto, supermercado,
+                                   precio=precio, anterior=base[0], variacion=round(variacion, 4),
+                                   media=round(base[1], 2), z=round(z, 2) if z is not None else None))
+
+    # Desaparecidos: solo en supermercados que publicaron ese día (una tienda caída no cuenta)
+    afectados = set(df['producto'])
+    for supermercado, productos in df.groupby('supermercado')['producto']:
+        previo = estado["presentes"].get(supermercado)
+        if previo is not None and fecha < previo["fecha"]:
+            continue
+        if previo is None or fecha != previo["fecha"]:
+            anteriores = previo["productos"] if previo else []
+        else:
+            anteriores = previo["anteriores"]
+        hoy = sorted(set(productos))
+        estado["presentes"][supermercado] = {"fecha": fecha, "productos": hoy, "anteriores": anteriores}
+        for producto in sorted(set(anteriores) - set(hoy)):
+            precios.get(producto, {}).pop(supermercado, None)  # ya no compite por el más barato
+            afectados.add(producto)
+            eventos.append(_evento("desaparecido", categoria, fecha, producto, supermercado))
+
+    # Más barato entre el último precio conocido de cada supermercado (empate: orden de supermercado)
+    for producto in sorted(afectados):
+        actuales = precios.get(producto)
+        if not actuales:
+            continue
+        supermercado = min(actuales, key=lambda s: (actuales[s], s))
+        previo = estado["mas_barato"].get(producto)
+        if previo is not None and fecha < previo["fecha"]:
+            continue
+        if previo is None or fecha != previo["fecha"]:
+            anterior = previo["supermercado"] if previo else None
+        else:
+            anterior = previo["anterior"]
+        estado["mas_barato"][producto] = {"fecha": fecha, "supermercado": supermercado, "anterior": anterior}
+        if anterior is not None and anterior != supermercado:
+            eventos.append(_evento("nuevo_mas_barato", categoria, fecha, producto, supermercado,
+                                   precio=actuales[supermercado], antes=anterior))
+
+    return eventos
+
+
+def _sin_repetir(estado, eventos):
+    # Una misma alerta de una fecha se emite una sola vez aunque el día se reprocese
+    nuevos = []
+    for evento in eventos:
+        if evento["fecha"] != estado["emitidos"]["fecha"]:
+            estado["emitidos"] = {"fecha": evento["fecha"], "claves": []}
+        clave = f"{evento['tipo']}|{evento['producto']}|{evento['supermercado']}"
+        if clave not in estado["emitidos"]["claves"]:
+            estado["emitidos"]["claves"].append(clave)
+            nuevos.append(evento)
+    return nuevos
+
+
+def emitir(eventos):
+    if not eventos:
+        return
+    os.makedirs(ALERTAS_PATH, exist_ok=True)
+    with open(os.path.join(ALERTAS_PATH, EVENTOS_ARCHIVO), "a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in eventos))
+    if WEBHOOK_URL:
+        try:
+            requests.post(WEBHOOK_URL, json=eventos, timeout=5).raise_for_status()
+        except requests.RequestException as e:
+            print(f"⚠️ Webhook de alertas falló: {e}")
+
+
+def reconstruir(categoria, hasta=None):
+    # Arma el estado desde el almacén sin emitir nada (primera vez o después de borrarlo)
+    # `hasta` es exclusivo; el filtro va a la lectura (particiones y estadísticas del Parquet)
+    df = Price_Store.leer(categoria, hasta=pd.Timestamp(hasta) - pd.Timedelta(days=1) if hasta is not None else None)
+    estado = nuevo_estado()
+    for fecha, dia in df.groupby(df['fecha'].dt.strftime('%Y-%m-%d')):
+        # Se marcan como emitidas: si la última fecha se reprocesa no salen de golpe
+        _sin_repetir(estado, eventos_del_dia(estado, categoria, fecha, dia))
+        estado["ultima_fecha"] = fecha
+    guardar(categoria, estado)
+    return estado
+
+
+def procesar(categoria, procesadas, reconstruido=False):
+    # procesadas: {fecha: formato largo} recién unificado. Las fechas anteriores a lo ya visto se ignoran.
+    # reconstruido: el unificador rehízo toda la historia (p. ej. cambió el mapa y con él los canónicos),
+    # así que el estado guardado habla de otros productos y se rearma desde el almacén.
+    if not procesadas:
+        return []
+    with Metricas.medir("alertas", "procesar", categoria=categoria, fechas=len(procesadas)):
+        estado = cargar(categoria)
+        heredados = None
+        if estado is None or reconstruido:
+            # Toda la historia menos el último día es arranque; lo ya emitido de ese día no se repite
+            heredados = estado["emitidos"] if estado is not None else None
+            estado = reconstruir(categoria, hasta=max(procesadas))
+
+        eventos = []
+        for fecha in sorted(procesadas):
+            if estado["ultima_fecha"] is not None and fecha < estado["ultima_fecha"]:
+                continue
+            if heredados is not None and fecha == heredados["fecha"]:
+                estado["emitidos"] = heredados
+            eventos += _sin_repetir(estado, eventos_del_dia(estado, categoria, fecha, procesadas[fecha]))
+            estado["ultima_fecha"] = fecha
+
+        guardar(categoria, estado)
+        emitir(eventos)
+    if eventos:
+        print(f"🔔 {categoria}: {len(eventos)} alertas nuevas")
+    return eventos
+
+
+def leer_eventos(categoria=None, ultimos=20):
+    ruta = os.path.join(ALERTAS_PATH, EVENTOS_ARCHIVO)
+    if not os.path.exists(ruta):
+        return []
+    with open(ruta, encoding="utf-8") as f:
+        eventos = [json.loads(linea) for linea in f if linea.strip()]
+    if categoria:
+        eventos = [e for e in eventos if e["categoria"] == categoria]
+    return eventos[-ultimos:]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Alertas de precios: reconstruye el estado o muestra los últimos eventos.")
+    parser.add_argument("--categoria", choices=list(CATEGORIAS), default=CATEGORIA_DEFECTO)
+    parser.add_argument("--reconstruir", action="store_true", help="Rearma el estado desde el almacén sin emitir alertas")
+    parser.add_argument("--ultimos", type=int, default=20, help="Cantidad de eventos a mostrar")
+    args = parser.parse_args()
+
+    if args.reconstruir:
+        estado = reconstruir(args.categoria)
+        print(f"🔁 Estado de alertas de {args.categoria} reconstruido hasta {estado['ultima_fecha']} ({len(estado['series'])} series)")
+    for e in leer_eventos(args.categoria, args.ultimos):
+        detalle = {k: v for k, v in e.items() if k not in ("ts", "tipo", "categoria", "fecha", "producto", "supermercado")}
+        print(f"🔔 {e['fecha']} {e['tipo']:<16} {e['supermercado']:<10} {e['producto']}  {detalle}")
@@ -1,94 +1,105 @@
 import asyncio
-from playwright.async_api import async_playwright
-import pandas as pd
-import os
+import argparse
 from datetime import datetime
-
-async def scrape_anonima_cremosos():
-    base_url = "https://supermercado.laanonimaonline.com/buscar?pag={page}&clave=queso+cremoso"
-    keywords = ["cremoso", "cremon"]
+from Categorias import CATEGORIAS, coincide, busquedas
+from Scraping_Utils import navegador, nuevo_contexto, cronometro, recorrer_paginas, por_categoria, esperar_grilla, CHROMIUM_ARGS, PRESUPUESTO_ESPERA
+
+# Nombre, precio, stock y visibilidad de cada producto, todo en una sola evaluación
+JS_PRODUCTOS = """(productos) => productos.map(p => {
+    const nombre = p.querySelector("a[id^='btn_nombre_imetrics_']");
+    const precio = p.querySelector("div.precio.semibold.aux1");
+    const rect = p.getBoundingClientRect();
+    return {
+        nombre: nombre ? nombre.innerText : null,
+        precio: precio ? precio.innerText : null,
+        in_stock: !p.className.includes("sin_stock"),
+        strikethrough: false,
+        visible: rect.width > 0 && rect.height > 0 && getComputedStyle(p).visibility !== "hidden",
+    };
+})"""
+
+async def scrape_anonima(browser=None, categorias=None, paginas_paralelas=1, presupuesto_espera=PRESUPUESTO_ESPERA["anonima"], guardar=True):
+    # Devuelve {categoría: cantidad de productos}; todas las categorías comparten navegador y contexto.
+    # Cada página se entrega cruda al Pipeline (filtro, precios, duplicados, nombre canónico, CSV).
     fecha_actual = datetime.now().strftime('%Y-%m-%d')
-    all_productos = []
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True, args=[
-            "--disable-blink-features=AutomationControlled",
-            "--no-sandbox",
-            "--disable-dev-shm-usage",
-        ])
+    async def scrape_categoria(categoria, busqueda, journal):
+        clave = categoria["clave"]
 
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36",
-            viewport={"width": 1280, "height": 800},
-            locale="es-AR",
-        )
-        page = await context.new_page()
+        async def procesar_pagina(page, pagina):
+            # Devuelve (productos de la página, seguir con la próxima página)
+            print(f"🔄 [{clave}] Visitando página {pagina}...")
+            with cronometro("anonima", "navegacion", clave, pagina):
+                await page.goto(busqueda["url"].format(pagina=pagina), timeout=60000)
+            # Esperar que carguen los productos (hasta presupuesto_espera segundos)
+            with cronometro("anonima", "espera", clave, pagina):
+                await esperar_grilla(page, "div.producto", presupuesto_espera, f"anonima/{clave} p{pagina}")
 
-        # Inyectar script para camuflar headless
-        await page.add_init_script(
-            """() => {
-                Object.defineProperty(navigator, 'webdriver', { get: () => false });
-                window.chrome = { runtime: {} };
-                Object.defineProperty(navigator, 'plugins', { get: () => [1, 2, 3] });
-                Object.defineProperty(navigator, 'languages', { get: () => ['es-AR', 'es'] });
-            }"""
-        )
-
-        for pagina in range(1, 3):  # primeras 2 páginas
-            print(f"🔄 Visitando página {pagina}...")
-            await page.goto(base_url.format(page=pagina), timeout=60000)
-            # Esperar que carguen los productos - 5 segundos
-            await page.wait_for_timeout(5000)
-
-            productos = await page.query_selector_all("div.producto")
+            # Extraer toda la página en una sola llamada al navegador
+            with cronometro("anonima", "extraccion", clave, pagina):
+                productos = await page.eval_on_selector_all("div.producto", JS_PRODUCTOS)
 
             if not productos:
-                print(f"❌ No se encontraron productos en página {pagina}")
-                break
+                print(f"❌ [{clave}] No se encontraron productos en página {pagina}")
+                return [], False
 
-            productos_validos = 0
+            productos_pagina = []
 
             for producto in productos:
-                clases = await producto.get_attribute("class") or ""
-                if "sin_stock" in clases:
+                if not producto["in_stock"] or not producto["visible"]:
                     continue
-                if not await producto.is_visible():
+
+                if producto["nombre"] is None or producto["precio"] is None:
                     continue
 
-                nombre_elem = await producto.query_selector("a[id^='btn_nombre_imetrics_']")
-                precio_elem = await producto.query_selector("div.precio.semibold.aux1")
+                productos_pagina.append({
+                    "fecha": fecha_actual,
+                    "nombre": producto["nombre"].strip(),
+                    "precio": producto["precio"].strip()  # Ej: "$ 14.900"
+                })
 
-                if not nombre_elem or not precio_elem:
-                    continue
+            # Se corta cuando la página ya no trae nada de la categoría (el filtro en sí lo hace el Pipeline)
+            if not any(coincide(categoria, p["nombre"]) for p in productos_pagina):
+                print(f"⛔ [{clave}] Sin productos válidos con stock visibles en página {pagina}, se detiene el scraping.")
+                return [], False
 
-                nombre = (await nombre_elem.inner_text()).strip()
-                precio_entero = (await precio_elem.inner_text()).strip()  # Ej: "$ 14.900"
-                precio_str = precio_entero.replace("$", "").replace(".", "").replace(",00", "").strip()
+            return productos_pagina, True
 
-                if any(kw in nombre.lower() for kw in keywords):
-                    all_productos.append({
-                        "fecha": fecha_actual,
-                        "nombre": nombre,
-                        "precio": precio_str
-                    })
-                    productos_validos += 1
+        # primeras páginas de la búsqueda (2 por defecto)
+        paginas = range(1, busqueda.get("paginas", 2) + 1)
+        async for registros in recorrer_paginas(context, paginas, procesar_pagina, paginas_paralelas, journal, f"anonima/{clave}"):
+            yield registros
 
-            if productos_validos == 0:
-                print(f"⛔ Sin productos válidos con stock visibles en página {pagina}, se detiene el scraping.")
-                break
+    async with navegador(browser, args=CHROMIUM_ARGS) as browser:
+        context = await nuevo_contexto(
+            browser, "anonima",
+            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36",
+            viewport={"width": 1280, "height": 800},
+            locale="es-AR",
+        )
 
-        await browser.close()
+        # Inyectar script para camuflar headless (a nivel contexto, así vale para todas las pestañas)
+        await context.add_init_script(
+            """() => {
+                Object.defineProperty(navigator, 'webdriver', { get: () => false });
+                window.chrome = { runtime: {} };
+                Object.defineProperty(navigator, 'plugins', { get: () => [1, 2, 3] });
+                Object.defineProperty(navigator, 'languages', { get: () => ['es-AR', 'es'] });
+            }"""
+        )
 
-    return all_productos
+        # Todas las categorías en el mismo contexto (cookies compartidas)
+        resultados = await por_categoria("anonima", busquedas("anonima", categorias), scrape_categoria, guardar)
+
+        await context.close()
+
+    return resultados
 
 if __name__ == "__main__":
-    resultados = asyncio.run(scrape_anonima_cremosos())
-    print(f"\n✅ Se encontraron {len(resultados)} productos que contienen 'cremoso' o 'cremon' y están en stock visibles.")
-
-    if resultados:
-        df = pd.DataFrame(resultados).drop_duplicates()
-        fecha_actual = datetime.now().strftime('%Y-%m-%d')
-        os.makedirs("Data/Raw", exist_ok=True)
-        ruta_archivo = f"Data/Raw/anonima_raw_{fecha_actual}.csv"
-        df.to_csv(ruta_archivo, index=False, encoding='utf-8-sig')
-        print(f"📁 Archivo guardado en: {ruta_archivo}")
+    parser = argparse.ArgumentParser(description="Scraper de La Anónima.")
+    parser.add_argument("--categorias", nargs="+", choices=list(CATEGORIAS), help="Categorías a scrapear (por defecto, todas)")
+    args = parser.parse_args()
+
+    resultados = asyncio.run(scrape_anonima(categorias=args.categorias))
+    for categoria, cantidad in resultados.items():
+        print(f"✅ {categoria}: {cantidad} productos en stock visibles.")
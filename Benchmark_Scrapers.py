@@ -0,0 +1,116 @@
+import asyncio
+import argparse
+import json
+import os
+import subprocess
+import time
+from datetime import datetime
+
+import Scraping_Utils
+import Metricas
+from Scraping_Utils import navegador, CHROMIUM_ARGS, TIEMPOS, CONTEOS
+from Run_Scrapers import SCRAPERS
+from Categorias import CATEGORIAS, CATEGORIA_DEFECTO
+
+BENCHMARKS_PATH = os.path.join("Data", "Benchmarks")
+ETAPAS = ["navegacion", "espera", "scroll", "extraccion"]
+
+# En fixtures no hay API: Carrefour y Jumbo tienen que ir por el navegador para grabar/reproducir páginas
+KWARGS_FIXTURES = {
+    "carrefour": {"usar_api": False},
+    "jumbo": {"usar_api": False},
+}
+
+
+def commit_actual():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "desconocido"
+
+
+async def medir_tienda(tienda, browser, categorias):
+    TIEMPOS.pop(tienda, None)
+    CONTEOS.pop(tienda, None)
+
+    inicio = time.perf_counter()
+    # Sin guardar: se mide el pipeline completo pero no se pisan los CSV crudos de Data/Raw
+    por_categoria = await SCRAPERS[tienda](browser=browser, categorias=categorias, guardar=False, **KWARGS_FIXTURES.get(tienda, {}))
+    total = time.perf_counter() - inicio
+    productos = sum(por_categoria.values())
+
+    paginas = CONTEOS[tienda]["extraccion"]
+    return {
+        "total": total,
+        "paginas": paginas,
+        "productos": productos,
+        "paginas_por_seg": paginas / total if total else 0,
+        "productos_por_seg": productos / total if total else 0,
+        **{etapa: TIEMPOS[tienda][etapa] for etapa in ETAPAS},
+    }
+
+
+async def correr_benchmark(tiendas, repeticiones, categorias):
+    corridas = {tienda: [] for tienda in tiendas}
+    async with navegador(args=CHROMIUM_ARGS) as browser:
+        for _ in range(repeticiones):
+            # De a una tienda por vez, para que los tiempos no se pisen entre sí
+            for tienda in tiendas:
+                corridas[tienda].append(await medir_tienda(tienda, browser, categorias))
+
+    # Mediana de cada métrica entre repeticiones
+    resumen = {}
+    for tienda, medidas in corridas.items():
+        resumen[tienda] = {
+            clave: sorted(m[clave] for m in medidas)[len(medidas) // 2]
+            for clave in medidas[0]
+        }
+    return resumen
+
+
+def imprimir_resumen(resumen, anterior=None):
+    print(f"\n{'tienda':<10} {'total':>7} {'pág/s':>7} {'prod/s':>7} {'naveg':>7} {'espera':>7} {'scroll':>7} {'extrac':>7}")
+    for tienda, m in resumen.items():
+        linea = (
+            f"{tienda:<10} {m['total']:>6.2f}s {m['paginas_por_seg']:>7.2f} {m['productos_por_seg']:>7.1f} "
+            f"{m['navegacion']:>6.2f}s {m['espera']:>6.2f}s {m['scroll']:>6.2f}s {m['extraccion']:>6.2f}s"
+        )
+        if anterior and tienda in anterior:
+            delta = m["total"] / anterior[tienda]["total"] - 1 if anterior[tienda]["total"] else 0
+            linea += f"  ({delta:+.0%} vs. anterior)"
+        print(linea)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark offline de los scrapers sobre fixtures HAR grabadas.")
+    parser.add_argument("--grabar", action="store_true", help="Visita los sitios reales y graba las fixtures")
+    parser.add_argument("--tiendas", nargs="+", choices=list(SCRAPERS), default=list(SCRAPERS))
+    # Las fixtures solo tienen las categorías con las que se grabaron
+    parser.add_argument("--categorias", nargs="+", choices=list(CATEGORIAS), default=[CATEGORIA_DEFECTO])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--comparar", metavar="JSON", help="Resultado previo para comparar (Data/Benchmarks/...)")
+    args = parser.parse_args()
+
+    # Las corridas sobre fixtures no se mezclan con las métricas diarias de producción
+    Metricas.ACTIVAS = False
+
+    if args.grabar:
+        Scraping_Utils.MODO_FIXTURES = "grabar"
+        asyncio.run(correr_benchmark(args.tiendas, 1, args.categorias))
+        print(f"📁 Fixtures grabadas en: {Scraping_Utils.FIXTURES_PATH}")
+    else:
+        Scraping_Utils.MODO_FIXTURES = "reproducir"
+        resumen = asyncio.run(correr_benchmark(args.tiendas, args.repeticiones, args.categorias))
+
+        anterior = None
+        if args.comparar:
+            with open(args.comparar, encoding="utf-8") as f:
+                anterior = json.load(f)["tiendas"]
+        imprimir_resumen(resumen, anterior)
+
+        commit = commit_actual()
+        os.makedirs(BENCHMARKS_PATH, exist_ok=True)
+        ruta_archivo = os.path.join(BENCHMARKS_PATH, f"bench_{datetime.now().strftime('%Y-%m-%d_%H%M%S')}_{commit}.json")
+        with open(ruta_archivo, "w", encoding="utf-8") as f:
+            json.dump({"commit": commit, "repeticiones": args.repeticiones, "categorias": args.categorias, "tiendas": resumen}, f, indent=2)
+        print(f"📁 Resultado guardado en: {ruta_archivo}")
@@ -1,116 +1,105 @@
 import asyncio
-from playwright.async_api import async_playwright
-import pandas as pd
-import os
+import argparse
 from datetime import datetime
-import re
-
-async def scrape_carrefour_cremosos():
-    base_url = "https://www.carrefour.com.ar/Lacteos-y-productos-frescos/Quesos/Quesos-cremosos-y-mozzarellas?order="
-    all_products = []
-    seen_product_names = set()
+import Pipeline
+from Vtex_API import scrape_vtex_categorias
+from Categorias import CATEGORIAS, busquedas
+from Scraping_Utils import navegador, nuevo_contexto, cronometro, recorrer_paginas, por_categoria, esperar_grilla, scroll_hasta_estable, PRESUPUESTO_ESPERA
+
+# Nombre y primer precio no tachado de cada producto, todo en una sola evaluación
+JS_PRODUCTOS = """(productos) => productos.map(p => {
+    const nombre = p.querySelector("span.vtex-product-summary-2-x-productBrand");
+    const spans = [...p.querySelectorAll("span.valtech-carrefourar-product-price-0-x-currencyContainer")];
+    const tachado = s => s.className.includes("strikethrough") || s.parentElement.className.includes("strikethrough");
+    const vigente = spans.find(s => !tachado(s));
+    return {
+        nombre: nombre ? nombre.innerText : null,
+        precio: vigente ? vigente.innerText : null,
+        in_stock: true,
+        strikethrough: spans.some(tachado),
+    };
+})"""
+
+async def scrape_carrefour(browser=None, categorias=None, paginas_paralelas=1, presupuesto_espera=PRESUPUESTO_ESPERA["carrefour"], usar_api=True, guardar=True):
+    # Devuelve {categoría: cantidad de productos}; todas las categorías comparten navegador y contexto.
+    # Cada página se entrega cruda al Pipeline (filtro, precios, duplicados por nombre, nombre canónico, CSV).
     fecha_actual = datetime.now().strftime('%Y-%m-%d')
-    keywords = ["cremoso", "cremon"]
-
-    async def scroll_para_cargar_suave(page):
-        for i in range(10):
-            await page.mouse.wheel(0, 800)
-            await asyncio.sleep(1)
-        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-        await asyncio.sleep(2)
-
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context()
-        page = await context.new_page()
-        page.set_default_timeout(15000)
-
-        current_page = 1
-        max_pages = 10
-
-        while current_page <= max_pages:
-            url = f"{base_url}&page={current_page}"
-            print(f"🔄 Visitando página {current_page}...")
-            try:
-                await page.goto(url, timeout=20000)
-                await asyncio.sleep(3)
-            except Exception as e:
-                print(f"❌ Error cargando página {current_page}: {e}")
-                break
-
-            try:
-                await page.wait_for_selector("div.valtech-carrefourar-search-result-3-x-gallery", timeout=15000)
-            except:
-                print("❌ Galería no encontrada")
-                break
-
-            await scroll_para_cargar_suave(page)
-
-            products = page.locator("div.valtech-carrefourar-search-result-3-x-gallery > div > section > a")
-            count = await products.count()
-            if count == 0:
-                break
-
-            for i in range(count):
-                product = products.nth(i)
-                try:
-                    # Nombre
-                    name = "Nombre no disponible"
-                    try:
-                        name_element = product.locator("span.vtex-product-summary-2-x-productBrand")
-                        if await name_element.count() > 0:
-                            name = await name_element.inner_text(timeout=5000)
-                            name = name.strip()
-                    except:
-                        pass
-
-                    # Precio
-                    price = "Precio no disponible"
-                    try:
-                        price_spans = product.locator("span.valtech-carrefourar-product-price-0-x-currencyContainer")
-                        count_prices = await price_spans.count()
-                        for j in range(count_prices):
-                            span = price_spans.nth(j)
-                            classes = await span.evaluate("e => e.className")
-                            parent_classes = await span.evaluate("e => e.parentElement.className")
-                            if "strikethrough" not in classes and "strikethrough" not in parent_classes:
-                                price = await span.inner_text(timeout=3000)
-                                price = price.strip()
-                                break
-                    except:
-                        pass
-
-                    if any(kw in name.lower() for kw in keywords) and name not in seen_product_names:
-                        seen_product_names.add(name)
-                        # Limpiar precio con reemplazos simples
-                        precio_numero = price.replace(".", "").replace(",00", "").replace("$", "").strip()
-                        all_products.append({
-                            "fecha": fecha_actual,
-                            "nombre": name,
-                            "precio": precio_numero
-                        })
-
+    seleccion = busquedas("carrefour", categorias)
 
+    selector_productos = "div.valtech-carrefourar-search-result-3-x-gallery > div > section > a"
 
-                except:
-                    continue
+    async def scrape_categoria(categoria, busqueda, journal):
+        clave = categoria["clave"]
 
-            await asyncio.sleep(2)
-            current_page += 1
+        async def procesar_pagina(page, current_page):
+            # Devuelve (productos de la página, seguir con la próxima página)
+            url = busqueda["url"].format(pagina=current_page)
+            print(f"🔄 [{clave}] Visitando página {current_page}...")
+            # Un error de carga se propaga: recorrer_paginas reintenta solo esta página
+            with cronometro("carrefour", "navegacion", clave, current_page):
+                await page.goto(url, timeout=20000)
 
-        await browser.close()
-        return all_products
+            with cronometro("carrefour", "espera", clave, current_page):
+                try:
+                    await page.wait_for_selector("div.valtech-carrefourar-search-result-3-x-gallery", timeout=15000)
+                except:
+                    print(f"❌ [{clave}] Galería no encontrada")
+                    return [], False
+
+                await esperar_grilla(page, selector_productos, presupuesto_espera, f"carrefour/{clave} p{current_page}")
+
+            # Scroll suave hasta que dejen de aparecer productos (lazy load), con presupuesto máximo
+            with cronometro("carrefour", "scroll", clave, current_page):
+                await scroll_hasta_estable(page, selector_productos, presupuesto_espera, f"carrefour/{clave} p{current_page}", paso=800)
+
+            # Extraer toda la página en una sola llamada al navegador
+            with cronometro("carrefour", "extraccion", clave, current_page):
+                registros = await page.eval_on_selector_all(selector_productos, JS_PRODUCTOS)
+            if not registros:
+                return [], False
+
+            productos_pagina = []
+            for registro in registros:
+                name = (registro["nombre"] or "Nombre no disponible").strip()
+                price = (registro["precio"] or "Precio no disponible").strip()
+                productos_pagina.append({
+                    "fecha": fecha_actual,
+                    "nombre": name,
+                    "precio": price
+                })
+
+            return productos_pagina, True
+
+        # Las páginas se pueden repartir en varias pestañas; llegan al Pipeline en orden de página
+        paginas = range(1, busqueda.get("paginas", 10) + 1)
+        async for registros in recorrer_paginas(context, paginas, procesar_pagina, paginas_paralelas, journal, f"carrefour/{clave}"):
+            yield registros
+
+    # Camino rápido: API JSON de VTEX sin navegador; Playwright queda como respaldo
+    resultados = {}
+    if usar_api:
+        desde_api = await asyncio.to_thread(scrape_vtex_categorias, "carrefour", seleccion)
+        for clave, registros in desde_api.items():
+            resultados[clave] = await Pipeline.procesar(Pipeline.lotes_de(registros), "carrefour", CATEGORIAS[clave], guardar)
+        seleccion = [(c, b) for c, b in seleccion if c["clave"] not in resultados]
+        if not seleccion:
+            return resultados
+
+    async with navegador(browser) as browser:
+        context = await nuevo_contexto(browser, "carrefour")
+        context.set_default_timeout(15000)
+
+        resultados.update(await por_categoria("carrefour", seleccion, scrape_categoria, guardar))
+
+        await context.close()
+        return resultados
 
 if __name__ == "__main__":
-    resultados = asyncio.run(scrape_carrefour_cremosos())
-
-    print(f"\n✅ Se encontraron {len(resultados)} productos con 'cremoso' o 'cremon'.")
-
-    # Guardar en CSV
-    if resultados:
-        df = pd.DataFrame(resultados)
-        fecha_actual = datetime.now().strftime('%Y-%m-%d')
-        os.makedirs("Data/Raw", exist_ok=True)
-        ruta_archivo = f"Data/Raw/carrefour_raw_{fecha_actual}.csv"
-        df.to_csv(ruta_archivo, index=False, encoding='utf-8-sig')
-        print(f"📁 Archivo guardado en: {ruta_archivo}")
+    parser = argparse.ArgumentParser(description="Scraper de Carrefour.")
+    parser.add_argument("--categorias", nargs="+", choices=list(CATEGORIAS), help="Categorías a scrapear (por defecto, todas)")
+    args = parser.parse_args()
+
+    # Los CSV (uno por categoría) se escriben a medida que se scrapea
+    resultados = asyncio.run(scrape_carrefour(categorias=args.categorias))
+    for categoria, cantidad in resultados.items():
+        print(f"✅ {categoria}: {cantidad} productos.")
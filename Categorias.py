@@ -0,0 +1,50 @@
+import re
+import json
+
+# --- Catálogo de categorías (categorias.json) ---
+# Cada categoría define su búsqueda en cada supermercado, el patrón de nombres que
+# se queda, el mapa de unificación, la lista de exclusión y las reglas del motor de matching.
+CONFIG_PATH = "categorias.json"
+CATEGORIA_DEFECTO = "queso_cremoso"
+
+
+def cargar(ruta=CONFIG_PATH):
+    with open(ruta, encoding="utf-8") as f:
+        categorias = json.load(f)
+
+    for clave, categoria in categorias.items():
+        categoria["clave"] = clave
+        categoria.setdefault("busquedas", {})
+        categoria.setdefault("unificacion", {})
+        categoria.setdefault("excluir_productos", [])
+        categoria.setdefault("destacados", [])
+        # Reglas del motor de matching: marcas, alias que implican una marca y palabras que no distinguen productos
+        matching = categoria.setdefault("matching", {})
+        matching.setdefault("marcas", [])
+        matching.setdefault("alias_marca", {})
+        matching.setdefault("genericas", [])
+        # Patrones compilados una sola vez por corrida
+        categoria["regex_incluir"] = re.compile(categoria["patron"], re.IGNORECASE)
+        patron_excluir = categoria.get("patron_excluir")
+        categoria["regex_excluir"] = re.compile(patron_excluir, re.IGNORECASE) if patron_excluir else None
+    return categorias
+
+
+CATEGORIAS = cargar()
+
+
+def coincide(categoria, nombre):
+    # True si el nombre pertenece a la categoría (patrón de inclusión y no el de exclusión)
+    if not nombre or not categoria["regex_incluir"].search(nombre):
+        return False
+    return categoria["regex_excluir"] is None or not categoria["regex_excluir"].search(nombre)
+
+
+def busquedas(tienda, claves=None):
+    # [(categoría, búsqueda)] de las categorías pedidas que tienen búsqueda en la tienda
+    claves = claves or list(CATEGORIAS)
+    return [
+        (CATEGORIAS[clave], CATEGORIAS[clave]["busquedas"][tienda])
+        for clave in claves
+        if tienda in CATEGORIAS[clave]["busquedas"]
+    ]
@@ -1,95 +1,137 @@
-import re
 import asyncio
-from playwright.async_api import async_playwright
-import pandas as pd
-import os
+import argparse
 from datetime import datetime
+from Categorias import CATEGORIAS, busquedas
+from Scraping_Utils import navegador, nuevo_contexto, cronometro, por_categoria, con_reintentos, anotar_journal, esperar_grilla, scroll_hasta_estable, primer_texto, PRESUPUESTO_ESPERA
 
-async def scrape_coope_cremoso(max_pages=5):
+# Nombre y precio (entero y decimal por separado) de cada tarjeta, todo en una sola evaluación
+JS_PRODUCTOS = """(cards) => cards.map(c => {
+    const nombre = c.querySelector("div.card-descripcion p.text-capitalize");
+    const entero = c.querySelector("div.precio-entero");
+    const decimal = c.querySelector("div.precio-decimal");
+    return {
+        nombre: nombre ? nombre.innerText : null,
+        precio: entero ? entero.innerText : null,
+        decimal: decimal ? decimal.innerText : null,
+        in_stock: true,
+        strikethrough: false,
+    };
+})"""
+
+async def scrape_coope(browser=None, categorias=None, presupuesto_espera=PRESUPUESTO_ESPERA["coope"], guardar=True):
+    # Devuelve {categoría: cantidad de productos}; cada categoría usa su pestaña dentro del mismo contexto.
+    # Cada página se entrega cruda al Pipeline (filtro, precios, duplicados, nombre canónico, CSV).
     url = "https://www.lacoopeencasa.coop/"
-    busqueda = "queso cremoso"
-    patron = re.compile(r"cremoso|cremon", re.IGNORECASE)
-    productos = []
     fecha_actual = datetime.now().strftime('%Y-%m-%d')
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
-        await page.goto(url)
-        await page.wait_for_selector("input#idInputBusqueda")
-
-        # Buscar queso cremoso
-        await page.fill("input#idInputBusqueda", busqueda)
-        await page.keyboard.press("Enter")
-        await page.wait_for_selector("div.card-content", timeout=40000)
-
-        for _ in range(max_pages):
-            # Scroll para cargar productos
-            previous_height = 0
-            while True:
-                await page.evaluate("window.scrollBy(0, 1000)")
-                await asyncio.sleep(1)
-                current_height = await page.evaluate("document.body.scrollHeight")
-                if current_height == previous_height:
-                    break
-                previous_height = current_height
+    async def scrape_categoria(categoria, busqueda, journal):
+        clave = categoria["clave"]
 
-            # Extraer productos
-            cards = await page.query_selector_all("div.card-content")
-            for card in cards:
-                nombre_elem = await card.query_selector("div.card-descripcion p.text-capitalize")
-                nombre = await nombre_elem.inner_text() if nombre_elem else ""
-                nombre = nombre.strip()
+        # Pasos ya anotados en el journal del día: se entregan sin navegar
+        paso = 0
+        while journal is not None and paso in journal["pasos"]:
+            registros, seguir = journal["pasos"][paso]
+            if registros:
+                yield registros
+            if not seguir:
+                return
+            paso += 1
+
+        page = await context.new_page()
+
+        async def boton_siguiente():
+            # Devuelve el <li> de la flecha derecha si todavía hay otra página
+            btn_siguiente = await page.query_selector("ul.pagination li.waves-effect svg use[href*='derecha']")
+            if not btn_siguiente:
+                return None
+            return await btn_siguiente.evaluate_handle("node => node.closest('li')")
+
+        async def avanzar(btn_siguiente_parent):
+            previo = await primer_texto(page, "div.card-descripcion p.text-capitalize")
+            with cronometro("coope", "navegacion", clave, paso):
+                await btn_siguiente_parent.click()
+            with cronometro("coope", "espera", clave, paso):
+                await page.wait_for_selector("div.card-content", timeout=40000)
+                await esperar_grilla(page, "div.card-descripcion p.text-capitalize", presupuesto_espera, f"coope/{clave}", previo=previo)
+
+        async def abrir(intento):
+            with cronometro("coope", "navegacion", clave, paso):
+                await page.goto(url)
+                await page.wait_for_selector("input#idInputBusqueda")
 
-                # Filtrar solo productos cremosos
-                if not patron.search(nombre):
-                    continue
+                # Buscar la categoría
+                await page.fill("input#idInputBusqueda", busqueda["busqueda"])
+                await page.keyboard.press("Enter")
+            with cronometro("coope", "espera", clave, paso):
+                await page.wait_for_selector("div.card-content", timeout=40000)
 
-                precio_entero = await card.query_selector("div.precio-entero")
-                precio_decimal = await card.query_selector("div.precio-decimal")
+        async def extraer(intento):
+            # Scroll para cargar productos, hasta que no aparezcan más tarjetas
+            with cronometro("coope", "scroll", clave, paso):
+                await scroll_hasta_estable(page, "div.card-content", presupuesto_espera, f"coope/{clave}")
+
+            # Extraer productos (toda la página en una sola llamada al navegador)
+            with cronometro("coope", "extraccion", clave, paso):
+                cards = await page.eval_on_selector_all("div.card-content", JS_PRODUCTOS)
+            productos = []
+            for card in cards:
+                nombre = (card["nombre"] or "").strip()
 
                 precio_text = ""
-                if precio_entero:
-                    precio_text = (await precio_entero.inner_text()).strip()
+                if card["precio"] is not None:
+                    precio_text = card["precio"].strip()
 
-                if precio_decimal:
-                    precio_text += "," + (await precio_decimal.inner_text()).strip()
+                if card["decimal"] is not None:
+                    precio_text += "," + card["decimal"].strip()
                 else:
                     precio_text += ",00"
 
-                # Quitar $ y espacios, solo el número
-                precio_numero = precio_text.replace("$", "").replace(" ", "").replace(".", "").replace(",00", "")
-
                 productos.append({
                     "fecha": fecha_actual,
                     "nombre": nombre,
-                    "precio": precio_numero
+                    "precio": precio_text
                 })
+            return productos
 
-            # Ir a la siguiente página si existe
-            btn_siguiente = await page.query_selector("ul.pagination li.waves-effect svg use[href*='derecha']")
-            if btn_siguiente:
-                btn_siguiente_parent = await btn_siguiente.evaluate_handle("node => node.closest('li')")
-                if btn_siguiente_parent:
-                    await btn_siguiente_parent.click()
-                    await page.wait_for_timeout(4000)
-                    await page.wait_for_selector("div.card-content", timeout=40000)
-                else:
+        try:
+            await con_reintentos(abrir, f"coope/{clave}")
+
+            # La paginación es por clicks: se avanza hasta el primer paso pendiente sin extraer
+            for _ in range(paso):
+                btn_siguiente_parent = await boton_siguiente()
+                if not btn_siguiente_parent:
+                    return
+                await avanzar(btn_siguiente_parent)
+
+            while paso < busqueda.get("paginas", 5):
+                registros = await con_reintentos(extraer, f"coope/{clave} paso{paso}")
+                # Ir a la siguiente página si existe
+                btn_siguiente_parent = await boton_siguiente()
+                seguir = bool(btn_siguiente_parent) and paso + 1 < busqueda.get("paginas", 5)
+                anotar_journal(journal, paso, registros, seguir)
+                yield registros
+
+                if not seguir:
                     break
-            else:
-                break
+                await avanzar(btn_siguiente_parent)
+                paso += 1
+
+        finally:
+            await page.close()
+
+    async with navegador(browser) as browser:
+        context = await nuevo_contexto(browser, "coope")
 
-        await browser.close()
-        return productos
+        resultados = await por_categoria("coope", busquedas("coope", categorias), scrape_categoria, guardar)
+
+        await context.close()
+        return resultados
 
 if __name__ == "__main__":
-    resultados = asyncio.run(scrape_coope_cremoso())
-    print(f"\n✅ Se encontraron {len(resultados)} productos de 'queso cremoso' en La Coope.")
-
-    if resultados:
-        df = pd.DataFrame(resultados)
-        fecha_actual = datetime.now().strftime('%Y-%m-%d')
-        os.makedirs("Data/Raw", exist_ok=True)
-        ruta_archivo = f"Data/Raw/coope_raw_{fecha_actual}.csv"
-        df.to_csv(ruta_archivo, index=False, encoding='utf-8-sig')
-        print(f"📁 Archivo guardado en: {ruta_archivo}")
+    parser = argparse.ArgumentParser(description="Scraper de La Coope en Casa.")
+    parser.add_argument("--categorias", nargs="+", choices=list(CATEGORIAS), help="Categorías a scrapear (por defecto, todas)")
+    args = parser.parse_args()
+
+    resultados = asyncio.run(scrape_coope(categorias=args.categorias))
+    for categoria, cantidad in resultados.items():
+        print(f"✅ {categoria}: {cantidad} productos en La Coope.")
@@ -1,81 +1,120 @@
 import asyncio
-from playwright.async_api import async_playwright
-import pandas as pd
-import os
+import argparse
 from datetime import datetime
-import re
+from Categorias import CATEGORIAS, busquedas
+from Scraping_Utils import navegador, nuevo_contexto, cronometro, por_categoria, con_reintentos, anotar_journal, esperar_grilla, primer_texto, PRESUPUESTO_ESPERA
 
-async def scrape_coto_cremosos():
-    url = (
-        "https://www.cotodigital.com.ar/sitios/cdigi/categoria/catalogo-frescos-quesos-quesos-blandos/_/N-1ekbxyw"
-        "?Dy=1&Nf=product.startDate%7CLTEQ%201.75392E12%7C%7Cproduct.endDate%7CGTEQ%201.75392E12"
-        "&Nr=AND(product.sDisp_200:1004,product.language:espa%C3%B1ol,OR(product.siteId:CotoDigital))"
-        "&Ntt=queso%20cremoso&idSucursal=200"
-    )
+# Nombre y precio de cada tarjeta, todo en una sola evaluación
+JS_PRODUCTOS = """(productos) => productos.map(p => {
+    const nombre = p.querySelector("h3.nombre-producto");
+    const precio = p.querySelector("h4.card-title");
+    return {
+        nombre: nombre ? nombre.innerText : null,
+        precio: precio ? precio.innerText : null,
+        in_stock: true,
+        strikethrough: false,
+    };
+})"""
 
-    keywords = ["cremoso", "cremon"]
+async def scrape_coto(browser=None, categorias=None, presupuesto_espera=PRESUPUESTO_ESPERA["coto"], guardar=True):
+    # Devuelve {categoría: cantidad de productos}; cada categoría usa su pestaña dentro del mismo contexto.
+    # Cada página se entrega cruda al Pipeline (filtro, precios, duplicados, nombre canónico, CSV).
     fecha_actual = datetime.now().strftime('%Y-%m-%d')
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True, args=[
-            "--disable-blink-features=AutomationControlled",
-        ])
-        context = await browser.new_context(user_agent=(
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/114.0.0.0 Safari/537.36"
-        ))
+    async def scrape_categoria(categoria, busqueda, journal):
+        clave = categoria["clave"]
+
+        # Pasos ya anotados en el journal del día: se entregan sin navegar
+        paso = 0
+        while journal is not None and paso in journal["pasos"]:
+            registros, seguir = journal["pasos"][paso]
+            if registros:
+                yield registros
+            if not seguir:
+                return
+            paso += 1
+
         page = await context.new_page()
-        await page.goto(url)
-        await asyncio.sleep(5)
 
-        all_productos = []
+        async def boton_siguiente():
+            # Devuelve el botón "Siguiente" si todavía hay otra página
+            siguiente = await page.query_selector("a.page-link.page-back-next:has-text('Siguiente')")
+            if not siguiente or not await siguiente.is_visible():
+                return None
+            clases = await siguiente.get_attribute("class")
+            if clases and "disabled" in clases:
+                return None
+            return siguiente
+
+        async def avanzar(siguiente):
+            # Esperar a que la grilla cambie de página en lugar de un sleep fijo
+            previo = await primer_texto(page, "h3.nombre-producto")
+            with cronometro("coto", "navegacion", clave, paso):
+                await siguiente.click()
+            with cronometro("coto", "espera", clave, paso):
+                await esperar_grilla(page, "h3.nombre-producto", presupuesto_espera, f"coto/{clave}", previo=previo)
 
-        while True:
-            try:
+        async def abrir(intento):
+            with cronometro("coto", "navegacion", clave, paso):
+                await page.goto(busqueda["url"])
+            with cronometro("coto", "espera", clave, paso):
+                await esperar_grilla(page, "h3.nombre-producto", presupuesto_espera, f"coto/{clave}")
+
+        async def extraer(intento):
+            with cronometro("coto", "espera", clave, paso):
                 await page.wait_for_selector("div.centro-precios", timeout=40000)
-            except:
-                break
-
-            productos = await page.query_selector_all("div.centro-precios")
-            for producto in productos:
-                nombre_elem = await producto.query_selector("h3.nombre-producto")
-                precio_elem = await producto.query_selector("h4.card-title")
-                if nombre_elem and precio_elem:
-                    nombre = (await nombre_elem.inner_text()).strip()
-                    precio_raw = (await precio_elem.inner_text()).strip()
-
-                    if any(kw in nombre.lower() for kw in keywords):
-                        precio_numero = precio_raw.replace(".", "").replace(",00", "").replace("$", "").strip()
-                        all_productos.append({
-                            "fecha": fecha_actual,
-                            "nombre": nombre,
-                            "precio": precio_numero
-                        })
+            # Extraer toda la página en una sola llamada al navegador
+            with cronometro("coto", "extraccion", clave, paso):
+                productos = await page.eval_on_selector_all("div.centro-precios", JS_PRODUCTOS)
+            return [
+                {"fecha": fecha_actual, "nombre": producto["nombre"].strip(), "precio": producto["precio"].strip()}
+                for producto in productos
+                if producto["nombre"] is not None and producto["precio"] is not None
+            ]
 
-            siguiente = await page.query_selector("a.page-link.page-back-next:has-text('Siguiente')")
-            if siguiente and await siguiente.is_visible():
-                clases = await siguiente.get_attribute("class")
-                if clases and "disabled" in clases:
+        try:
+            await con_reintentos(abrir, f"coto/{clave}")
+
+            # La paginación es por clicks: se avanza hasta el primer paso pendiente sin extraer
+            for _ in range(paso):
+                siguiente = await boton_siguiente()
+                if siguiente is None:
+                    return
+                await avanzar(siguiente)
+
+            while True:
+                registros = await con_reintentos(extraer, f"coto/{clave} paso{paso}")
+                siguiente = await boton_siguiente()
+                anotar_journal(journal, paso, registros, siguiente is not None)
+                yield registros
+
+                if siguiente is None:
                     break
-                await siguiente.click()
-                await asyncio.sleep(5)
-            else:
-                break
+                await avanzar(siguiente)
+                paso += 1
 
-        await browser.close()
+        finally:
+            await page.close()
 
-    return all_productos
+    async with navegador(browser, args=["--disable-blink-features=AutomationControlled"]) as browser:
+        context = await nuevo_contexto(browser, "coto", user_agent=(
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) "
+            "Chrome/114.0.0.0 Safari/537.36"
+        ))
+
+        resultados = await por_categoria("coto", busquedas("coto", categorias), scrape_categoria, guardar)
+
+        await context.close()
+
+    return resultados
 
 if __name__ == "__main__":
-    resultados = asyncio.run(scrape_coto_cremosos())
-    print(f"Se encontraron {len(resultados)} productos que contienen 'cremoso' o 'cremon'.")
-
-    # Guardar en CSV
-    if resultados:
-        df = pd.DataFrame(resultados)
-        fecha_actual = datetime.now().strftime('%Y-%m-%d')
-        os.makedirs("Data/Raw", exist_ok=True)
-        ruta_archivo = f"Data/Raw/coto_raw_{fecha_actual}.csv"
-        df.to_csv(ruta_archivo, index=False, encoding='utf-8-sig')
-        print(f"Archivo guardado en: {ruta_archivo}")
+    parser = argparse.ArgumentParser(description="Scraper de Coto.")
+    parser.add_argument("--categorias", nargs="+", choices=list(CATEGORIAS), help="Categorías a scrapear (por defecto, todas)")
+    args = parser.parse_args()
+
+    # Los CSV (uno por categoría) se escriben a medida que se scrapea
+    resultados = asyncio.run(scrape_coto(categorias=args.categorias))
+    for categoria, cantidad in resultados.items():
+        print(f"{categoria}: se encontraron {cantidad} productos.")
@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+
+import Price_Snapshot
+import Price_Aggregates
+import Metricas
+
+# --- Caché de datos del dashboard ---
+# El histórico sale de la foto Arrow que deja el unificador (Price_Snapshot): se abre con memory map,
+# así que arrancar no depende del tamaño de la historia, y solo se materializa en pandas la fecha
+# o el producto que se muestra. Los agregados materializados dan el promedio y la ventana de 30 días.
+# Cuando cambia la foto o los agregados se vuelven a abrir.
+
+
+def nuevo_estado(categoria):
+    return {
+        "categoria": categoria,
+        "firmas": {},     # ruta de cada agregado -> (mtime_ns, size)
+        "foto": None,     # ruta de la versión abierta de la foto
+        "tabla": None,    # tabla Arrow con memory map, ordenada por fecha
+        "indice": None,   # {"fechas": {fecha: [inicio, fin]}, "productos", "supermercados"}
+        "supermercados": [],
+        "anchas": {},     # fecha -> formato ancho de ese día (una columna por supermercado)
+        "fechas_producto": {},  # producto -> fechas en las que aparece
+        "avg_hist": None,  # Serie Producto -> promedio histórico (de los agregados)
+        "ventana": None,   # últimos 30 días por producto (de los agregados)
+        "lock": threading.Lock(),
+        "tiempos": {},
+    }
+
+
+def _abrir(estado):
+    estado["foto"], estado["tabla"], estado["indice"] = Price_Snapshot.abrir(estado["categoria"])
+    estado["supermercados"] = [s.title() for s in estado["indice"]["supermercados"]]
+    estado["anchas"] = {}
+    estado["fechas_producto"] = {}
+
+
+def fechas(estado, producto=None):
+    # Fechas disponibles ('YYYY-MM-DD', de la más reciente a la más vieja), de todo o de un producto
+    if producto is None:
+        return sorted(estado["indice"]["fechas"], reverse=True)
+    if producto not in estado["fechas_producto"]:
+        estado["fechas_producto"][producto] = sorted(Price_Snapshot.fechas_producto(estado["tabla"], producto), reverse=True)
+    return estado["fechas_producto"][producto]
+
+
+def productos(estado):
+    return estado["indice"]["productos"]
+
+
+def vista_ancha(estado, fecha):
+    # Una columna por supermercado para una sola fecha: el índice de la foto da el rango de filas
+    # del día y solo ese corte se pasa a pandas
+    ancha = estado["anchas"].get(fecha)
+    if ancha is None:
+        dia = Price_Snapshot.dia(estado["tabla"], estado["indice"], fecha)
+        dia['supermercado'] = dia['supermercado'].str.title()
+        ancha = (
+            dia.drop_duplicates(subset=['producto', 'supermercado'])
+            .rename(columns={'producto': 'Producto', 'supermercado': 'Supermercado', 'precio': 'Precio'})
+            .set_index(['Producto', 'Supermercado'])['Precio']
+            .unstack('Supermercado')
+            .reindex(columns=estado["supermercados"])
+            .reset_index()
+        )
+        ancha.columns.name = None
+        estado["anchas"][fecha] = ancha
+    return ancha
+
+
+def _cargar_agregados(estado):
+    # Promedio histórico por producto = suma total / cantidad total de todos los supermercados
+    historico = Price_Aggregates.leer_historico(estado["categoria"])
+    totales = historico.groupby('producto')[['suma', 'cantidad']].sum()
+    estado["avg_hist"] = (totales['suma'] / totales['cantidad']).rename_axis('Producto').rename('Promedio histórico')
+
+    ventana = Price_Aggregates.leer_ventana(estado["categoria"])
+    ventana['supermercado'] = ventana['supermercado'].str.title()
+    estado["ventana"] = ventana.rename(columns={'producto': 'Producto', 'supermercado': 'Supermercado', 'precio': 'Precio'})
+
+
+def firmas_agregados(categoria):
+    firmas = {}
+    for ruta in (Price_Aggregates.ruta(categoria, Price_Aggregates.HISTORICO), Price_Aggregates.ruta(categoria, Price_Aggregates.VENTANA)):
+        if os.path.exists(ruta):
+            stat = os.stat(ruta)
+            firmas[ruta] = (stat.st_mtime_ns, stat.st_size)
+    return firmas
+
+
+def serie_30_dias(estado, producto, super_cols):
+    # Precios de los últimos 30 días del producto, una columna por supermercado (lookup en la ventana)
+    ventana = estado["ventana"]
+    df_prod = ventana[ventana['Producto'] == producto]
+    chart_df = df_prod.pivot_table(index='fecha', columns='Supermercado', values='Precio', aggfunc='first')
+    return chart_df.reindex(columns=super_cols)
+
+
+def actualizar(estado):
+    # Vuelve a abrir la foto o los agregados solo si cambiaron; si no cambió nada no hace nada
+    inicio = time.perf_counter()
+    with estado["lock"]:
+        firmas = firmas_agregados(estado["categoria"])
+        agregados_cambiados = any(estado["firmas"].get(ruta) != firma for ruta, firma in firmas.items())
+
+        # Cada versión de la foto es un archivo nuevo: alcanza con comparar la ruta
+        if estado["tabla"] is None or Price_Snapshot.actual(estado["categoria"]) != estado["foto"]:
+            with Metricas.medir("dashboard", "snapshot", categoria=estado["categoria"]):
+                _abrir(estado)
+        if agregados_cambiados or estado["avg_hist"] is None:
+            with Metricas.medir("dashboard", "agregados", categoria=estado["categoria"]):
+                _cargar_agregados(estado)
+        estado["firmas"] = firmas
+
+        estado["tiempos"]["carga"] = time.perf_counter() - inicio
+        Metricas.registrar("dashboard", "carga", estado["tiempos"]["carga"], categoria=estado["categoria"])
+        estado["tiempos"]["registros"] = estado["tabla"].num_rows
+        return estado["avg_hist"]
@@ -1,86 +1,91 @@
-import os
-import glob
-import numpy as np
-import pandas as pd
+import time
+
+inicio_render = time.perf_counter()
+
 import streamlit as st
-from datetime import timedelta
+from Categorias import CATEGORIAS, CATEGORIA_DEFECTO
+
+# Tiempo hasta la tabla del día (primer dato en pantalla); por encima se avisa en el log
+OBJETIVO_PRIMERA_TABLA = 1.5
 
 # -------------------- Configuración --------------------
+# El encabezado se pinta antes de importar pandas/pyarrow y de abrir los datos
 st.set_page_config(page_title="Monitoreo de precios", layout="wide")
 st.title("Monitoreo de precios")
 #st.logo("logo.jpeg", size="large")         -----------> Descomentar cuando no sea público el link
-st.header("🧀 Quesos Cremosos en supermercados")
-
-# -------------------- Carga de archivos consolidados --------------------
-@st.cache_data
-def load_data():
-    all_dfs = []
-    for fp in glob.glob("Data/Prueba2/productos_unificados_*.csv"):
-        df = pd.read_csv(fp, parse_dates=['fecha'])
-        df.rename(columns={'producto': 'Producto'}, inplace=True)
-        
-        # Normalizar nombres de supermercados
-        df.columns = [col.title() if col.lower() not in ['fecha', 'producto'] else col for col in df.columns]
-        all_dfs.append(df)
-    
-    return pd.concat(all_dfs, ignore_index=True)
-
-df = load_data()
+tiempo_primer_pintado = time.perf_counter() - inicio_render
+
+import Dashboard_Data
+import Price_Snapshot
+import Metricas
+
+# -------------------- Categoría --------------------
+# Solo las categorías configuradas que ya tienen foto del unificador
+claves = [c for c in CATEGORIAS if Price_Snapshot.actual(c)] or [CATEGORIA_DEFECTO]
+clave_sel = st.sidebar.selectbox(
+    "Categoría", claves,
+    index=claves.index(CATEGORIA_DEFECTO) if CATEGORIA_DEFECTO in claves else 0,
+    format_func=lambda c: CATEGORIAS[c]["nombre"],
+)
+categoria = CATEGORIAS[clave_sel]
+st.header(f"{categoria['emoji']} {categoria['nombre']} en supermercados")
+
+# -------------------- Carga de la foto del histórico --------------------
+@st.cache_resource
+def estado_datos(clave):
+    # Un estado por categoría compartido entre sesiones; se actualiza solo cuando cambian los archivos
+    return Dashboard_Data.nuevo_estado(clave)
+
+estado = estado_datos(clave_sel)
+avg_hist = Dashboard_Data.actualizar(estado)
+
+def formato_fecha(fecha):
+    # 'YYYY-MM-DD' -> 'DD-MM-YYYY'
+    return "-".join(reversed(fecha.split("-")))
 
 # -------------------- Última actualización --------------------
-ultima_fecha = df['fecha'].max().strftime("%d-%m-%Y")
+todas_las_fechas = Dashboard_Data.fechas(estado)
+ultima_fecha = formato_fecha(todas_las_fechas[0]) if todas_las_fechas else "-"
 st.markdown(f"<small>📅 Última actualización: {ultima_fecha}</small>", unsafe_allow_html=True)
 
 # -------------------- Sidebar: Filtros --------------------
 st.sidebar.header("Filtros")
-productos = ["Todos"] + sorted(df['Producto'].unique())
+productos = ["Todos"] + Dashboard_Data.productos(estado)
 prod_sel = st.sidebar.selectbox("Producto", productos)
 if prod_sel != "Todos":
-    df = df[df['Producto'] == prod_sel]
-
-fechas_disponibles = sorted(df['fecha'].unique(), reverse=True)
-fecha_sel = st.sidebar.selectbox("Fecha", fechas_disponibles, format_func=lambda x: x.strftime("%d-%m-%Y"))
-df_latest = df[df['fecha'] == fecha_sel].copy()
+    fechas_disponibles = Dashboard_Data.fechas(estado, prod_sel)
+else:
+    fechas_disponibles = todas_las_fechas
+fecha_sel = st.sidebar.selectbox("Fecha", fechas_disponibles, format_func=formato_fecha)
+
+# Formato ancho solo de la fecha elegida: es lo único del histórico que se pasa a pandas
+with Metricas.medir("dashboard", "vista_ancha", categoria=clave_sel):
+    df_latest = Dashboard_Data.vista_ancha(estado, fecha_sel)
+if prod_sel != "Todos":
+    df_latest = df_latest[df_latest['Producto'] == prod_sel]
 
 # -------------------- Promedio histórico --------------------
-super_cols = [col for col in df.columns if col not in ['fecha', 'Producto']]
-df_long = df.melt(id_vars=['fecha', 'Producto'], value_vars=super_cols, var_name='Supermercado', value_name='Precio')
-df_long.dropna(subset=['Precio'], inplace=True)
-
-avg_hist = df_long.groupby('Producto')['Precio'].mean().reset_index(name='Promedio histórico')
+# avg_hist viene de los agregados materializados (sin melt/groupby en cada interacción)
+super_cols = estado["supermercados"]
 
 # -------------------- Tabla ejecutiva --------------------
-st.subheader(f"📊 Precios del {fecha_sel.strftime('%d-%m-%Y')}")
-
-pivot = df_latest.set_index('Producto')[super_cols]
-
-df_temp = df_long[df_long['fecha'] == fecha_sel]
-df_temp = df_temp.merge(avg_hist, on='Producto', how='left')
+st.subheader(f"📊 Precios del {formato_fecha(fecha_sel)}")
 
-pivot['Promedio histórico'] = df_temp.drop_duplicates(subset='Producto').set_index('Producto')['Promedio histórico']
+pivot = df_latest.set_index('Producto')[super_cols].copy()  # la vista ancha queda en caché: no se modifica
 
-productos_destacados = [
-    "Queso Cremoso fraccionado Punta del Agua x Kg.",
-    "Queso Cremoso Trozado Punta del Agua x 1 kg."
-]
-
-def resaltar_producto(val):
-    return 'background-color: blue' if val in productos_destacados else ''
+# Promedio histórico: lookup por producto en los agregados materializados
+pivot['Promedio histórico'] = pivot.index.map(avg_hist)
 
 pivot = pivot.reset_index()  # Esto convierte el índice 'Producto' en columna normal
 pivot = pivot.rename(columns={pivot.columns[0]: 'Producto'})  # Renombramos esa columna si quedó sin nombre
 
-styled = (
-    pivot
-    .style
-    .format("{:.2f}", subset=super_cols + ['Promedio histórico'])
-    .applymap(resaltar_producto, subset=['Producto'])
-    .highlight_max(axis=1, subset=super_cols, color='crimson')
-    .highlight_min(axis=1, subset=super_cols, color='forestgreen')
+# Primero la tabla sin estilos; los resaltados se aplican al final del script, sobre el mismo lugar
+tabla_precios = st.empty()
+tabla_precios.dataframe(
+    pivot, width="stretch",
+    column_config={col: st.column_config.NumberColumn(format="%.2f") for col in super_cols + ['Promedio histórico']},
 )
-
-
-st.dataframe(styled, use_container_width=True)
+tiempo_primera_tabla = time.perf_counter() - inicio_render
 
 st.markdown(
     """
@@ -94,11 +99,10 @@ st.markdown(
 
 # -------------------- Evolución por producto --------------------
 st.subheader("📈 Evolución en los últimos 30 días")
-prod_chart = st.selectbox("Seleccioná un producto", sorted(df['Producto'].unique()))
-df_chart = df[df['Producto'] == prod_chart]
-df_chart_30 = df_chart[df_chart['fecha'] >= df_chart['fecha'].max() - timedelta(days=30)]
-
-chart_df = df_chart_30.set_index('fecha')[super_cols]
+prod_chart = st.selectbox("Seleccioná un producto", Dashboard_Data.productos(estado) if prod_sel == "Todos" else [prod_sel])
+# Últimos 30 días del producto, leídos de la ventana precalculada
+with Metricas.medir("dashboard", "serie_30_dias", categoria=clave_sel):
+    chart_df = Dashboard_Data.serie_30_dias(estado, prod_chart, super_cols)
 st.line_chart(chart_df)
 
 # -------------------- Oportunidades de ahorro --------------------
@@ -122,6 +126,36 @@ st.line_chart(chart_df)
 #         )
 #         st.caption(row['Supermercado'])
 
+# -------------------- Estilos diferidos --------------------
+productos_destacados = categoria["destacados"]
+
+def resaltar_producto(val):
+    return 'background-color: blue' if val in productos_destacados else ''
+
+with Metricas.medir("dashboard", "estilos", categoria=clave_sel):
+    styled = (
+        pivot
+        .style
+        .format("{:.2f}", subset=super_cols + ['Promedio histórico'])
+        .map(resaltar_producto, subset=['Producto'])
+        .highlight_max(axis=1, subset=super_cols, color='crimson')
+        .highlight_min(axis=1, subset=super_cols, color='forestgreen')
+    )
+    tabla_precios.dataframe(styled, width="stretch")
+
+# -------------------- Tiempos --------------------
+tiempo_render = time.perf_counter() - inicio_render
+Metricas.registrar("dashboard", "primer_pintado", tiempo_primer_pintado, categoria=clave_sel)
+Metricas.registrar("dashboard", "primera_tabla", tiempo_primera_tabla, categoria=clave_sel)
+Metricas.registrar("dashboard", "render", tiempo_render, categoria=clave_sel)
+Metricas.volcar()  # el servidor no termina entre interacciones: se escribe en cada render
+print(f"⏱️ Dashboard: carga {estado['tiempos']['carga'] * 1000:.0f} ms ({estado['tiempos']['registros']} registros), "
+      f"primer pintado {tiempo_primer_pintado * 1000:.0f} ms, tabla {tiempo_primera_tabla * 1000:.0f} ms, "
+      f"render {tiempo_render * 1000:.0f} ms")
+if tiempo_primera_tabla > OBJETIVO_PRIMERA_TABLA:
+    print(f"⚠️ La tabla tardó {tiempo_primera_tabla:.2f} s en aparecer (objetivo {OBJETIVO_PRIMERA_TABLA:.1f} s)")
+st.sidebar.caption(f"⏱️ Carga {estado['tiempos']['carga'] * 1000:.0f} ms · tabla {tiempo_primera_tabla * 1000:.0f} ms · render {tiempo_render * 1000:.0f} ms")
+
 # -------------------- Créditos --------------------
 st.sidebar.markdown("---")
 st.sidebar.markdown(
@@ -1,64 +1,90 @@
 import asyncio
-from playwright.async_api import async_playwright
-import pandas as pd
-import os
+import argparse
 from datetime import datetime
+import Pipeline
+from Vtex_API import scrape_vtex_categorias
+from Categorias import CATEGORIAS, coincide, busquedas
+from Scraping_Utils import navegador, nuevo_contexto, cronometro, recorrer_paginas, por_categoria, esperar_grilla, PRESUPUESTO_ESPERA
 
-async def scrape_jumbo_cremosos():
-    base_url = "https://www.jumbo.com.ar/queso%20cremoso?_q=queso%20cremoso&map=ft&page={page}"
-    keywords = ["cremoso", "cremon"]
+# Nombres y precios de la galería emparejados por posición, todo en una sola evaluación
+JS_PRODUCTOS = """() => {
+    const nombres = [...document.querySelectorAll("span.vtex-product-summary-2-x-productBrand")];
+    const precios = [...document.querySelectorAll("div.vtex-price-format-gallery")];
+    const n = Math.min(nombres.length, precios.length);
+    return nombres.slice(0, n).map((e, i) => ({
+        nombre: e.innerText,
+        precio: precios[i].innerText,
+        in_stock: true,
+        strikethrough: false,
+    }));
+}"""
+
+async def scrape_jumbo(browser=None, categorias=None, paginas_paralelas=1, presupuesto_espera=PRESUPUESTO_ESPERA["jumbo"], usar_api=True, guardar=True):
+    # Devuelve {categoría: cantidad de productos}; todas las categorías comparten navegador y contexto.
+    # Cada página se entrega cruda al Pipeline (filtro, precios, duplicados, nombre canónico, CSV).
     fecha_actual = datetime.now().strftime('%Y-%m-%d')
-    all_productos = []
+    seleccion = busquedas("jumbo", categorias)
+
+    async def scrape_categoria(categoria, busqueda, journal):
+        clave = categoria["clave"]
+
+        async def procesar_pagina(page, pagina):
+            # Devuelve (productos de la página, seguir con la próxima página)
+            print(f"🔄 [{clave}] Visitando página {pagina}...")
+            with cronometro("jumbo", "navegacion", clave, pagina):
+                await page.goto(busqueda["url"].format(pagina=pagina), timeout=60000)
+            with cronometro("jumbo", "espera", clave, pagina):
+                await esperar_grilla(page, "div.vtex-price-format-gallery", presupuesto_espera, f"jumbo/{clave} p{pagina}")
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context()
-        page = await context.new_page()
+            # Extraer toda la página en una sola llamada al navegador
+            with cronometro("jumbo", "extraccion", clave, pagina):
+                registros = await page.evaluate(JS_PRODUCTOS)
 
-        # Cambié aquí: solo 1 y 2 (range es excluyente, así que 3 para que llegue a 2)
-        for pagina in range(1, 3):
-            print(f"🔄 Visitando página {pagina}...")
-            await page.goto(base_url.format(page=pagina), timeout=60000)
-            await page.wait_for_timeout(3000)
+            if not registros:
+                print(f"❌ [{clave}] Fin o error en página {pagina}")
+                return [], False
 
-            nombres = await page.query_selector_all("span.vtex-product-summary-2-x-productBrand")
-            precios = await page.query_selector_all("div.vtex-price-format-gallery")
+            productos_pagina = [
+                {"fecha": fecha_actual, "nombre": registro["nombre"].strip(), "precio": registro["precio"].strip()}
+                for registro in registros
+            ]
 
-            if not nombres or not precios:
-                print(f"❌ Fin o error en página {pagina}")
-                break
+            # Se corta cuando la página ya no trae nada de la categoría (el filtro en sí lo hace el Pipeline)
+            if not any(coincide(categoria, p["nombre"]) for p in productos_pagina):
+                print(f"⛔ [{clave}] Sin productos válidos en página {pagina}, se detiene el scraping.")
+                return [], False
 
-            productos_validos = 0
+            return productos_pagina, True
 
-            for nombre_elem, precio_elem in zip(nombres, precios):
-                nombre = (await nombre_elem.inner_text()).strip()
-                precio_raw = (await precio_elem.inner_text()).strip()
-                precio = precio_raw.replace("$", "").replace(".", "").replace(",", ".").strip()
+        # páginas 1 y 2 por defecto
+        paginas = range(1, busqueda.get("paginas", 2) + 1)
+        async for registros in recorrer_paginas(context, paginas, procesar_pagina, paginas_paralelas, journal, f"jumbo/{clave}"):
+            yield registros
 
-                if any(kw in nombre.lower() for kw in keywords):
-                    all_productos.append({
-                        "fecha": fecha_actual,
-                        "nombre": nombre,
-                        "precio": precio
-                    })
-                    productos_validos += 1
+    # Camino rápido: API JSON de VTEX sin navegador; Playwright queda como respaldo
+    resultados = {}
+    if usar_api:
+        desde_api = await asyncio.to_thread(scrape_vtex_categorias, "jumbo", seleccion)
+        for clave, registros in desde_api.items():
+            resultados[clave] = await Pipeline.procesar(Pipeline.lotes_de(registros), "jumbo", CATEGORIAS[clave], guardar)
+        seleccion = [(c, b) for c, b in seleccion if c["clave"] not in resultados]
+        if not seleccion:
+            return resultados
 
-            if productos_validos == 0:
-                print(f"⛔ Sin productos válidos en página {pagina}, se detiene el scraping.")
-                break
+    async with navegador(browser) as browser:
+        context = await nuevo_contexto(browser, "jumbo")
 
-        await browser.close()
+        resultados.update(await por_categoria("jumbo", seleccion, scrape_categoria, guardar))
 
-    return all_productos
+        await context.close()
+
+    return resultados
 
 if __name__ == "__main__":
-    resultados = asyncio.run(scrape_jumbo_cremosos())
-    print(f"\n✅ Se encontraron {len(resultados)} productos que contienen 'cremoso' o 'cremon'.")
-
-    if resultados:
-        df = pd.DataFrame(resultados)
-        fecha_actual = datetime.now().strftime('%Y-%m-%d')
-        os.makedirs("Data/Raw", exist_ok=True)
-        ruta_archivo = f"Data/Raw/jumbo_raw_{fecha_actual}.csv"
-        df.to_csv(ruta_archivo, index=False, encoding='utf-8-sig')
-        print(f"📁 Archivo guardado en: {ruta_archivo}")
+    parser = argparse.ArgumentParser(description="Scraper de Jumbo.")
+    parser.add_argument("--categorias", nargs="+", choices=list(CATEGORIAS), help="Categorías a scrapear (por defecto, todas)")
+    args = parser.parse_args()
+
+    resultados = asyncio.run(scrape_jumbo(categorias=args.categorias))
+    for categoria, cantidad in resultados.items():
+        print(f"✅ {categoria}: {cantidad} productos.")
@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import atexit
+import argparse
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# --- Métricas de tiempo de todo el circuito: scraping → unificación → dashboard (y API) ---
+# Cada medición es una línea JSON en Data/Metricas/<fecha>.jsonl:
+# {"ts", "componente", "etapa", "segundos", ...etiquetas (tienda, categoria, pagina, archivo...)}
+METRICAS_PATH = os.path.join("Data", "Metricas")
+ACTIVAS = True
+TAMAÑO_TANDA = 200  # se escribe al disco de a tandas para no abrir el archivo en cada página
+
+# Una etapa se marca como regresión si su p95 del día supera en este factor la mediana de los p95 anteriores
+FACTOR_REGRESION = 1.5
+
+_PENDIENTES = []
+_LOCK = threading.Lock()
+
+
+def ruta_dia(fecha=None):
+    fecha = fecha or datetime.now().strftime('%Y-%m-%d')
+    return os.path.join(METRICAS_PATH, f"{fecha}.jsonl")
+
+
+def volcar():
+    # Escribe las mediciones pendientes (se llama solo al llenarse la tanda y al salir)
+    with _LOCK:
+        pendientes = _PENDIENTES[:]
+        _PENDIENTES.clear()
+    if not pendientes:
+        return
+    os.makedirs(METRICAS_PATH, exist_ok=True)
+    por_dia = {}
+    for registro in pendientes:
+        por_dia.setdefault(registro["ts"][:10], []).append(registro)
+    for fecha, registros in por_dia.items():
+        # Una sola escritura en modo append: varios procesos pueden volcar al mismo archivo
+        with open(ruta_dia(fecha), "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in registros))
+
+
+atexit.register(volcar)
+
+
+def registrar(componente, etapa, segundos, **etiquetas):
+    if not ACTIVAS:
+        return
+    registro = {
+        "ts": datetime.now().isoformat(timespec="milliseconds"),
+        "componente": componente,
+        "etapa": etapa,
+        "segundos": round(segundos, 6),
+        **{k: v for k, v in etiquetas.items() if v is not None},
+    }
+    with _LOCK:
+        _PENDIENTES.append(registro)
+        lleno = len(_PENDIENTES) >= TAMAÑO_TANDA
+    if lleno:
+        volcar()
+
+
+@contextmanager
+def medir(componente, etapa, **etiquetas):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar(componente, etapa, time.perf_counter() - inicio, **etiquetas)
+
+
+# --- Reporte ---
+def leer(dias=14):
+    # Mediciones de los últimos `dias` días en formato largo
+    desde = (datetime.now() - timedelta(days=dias - 1)).strftime('%Y-%m-%d')
+    registros = []
+    if os.path.isdir(METRICAS_PATH):
+        for filename in sorted(os.listdir(METRICAS_PATH)):
+            if filename.endswith(".jsonl") and filename[:10] >= desde:
+                with open(os.path.join(METRICAS_PATH, filename), encoding="utf-8") as f:
+                    for linea in f:
+                        try:
+                            registros.append(json.loads(linea))
+                        except json.JSONDecodeError:
+                            continue  # línea cortada por una caída
+    df = pd.DataFrame(registros) if registros else pd.DataFrame(columns=["ts", "componente", "etapa", "segundos"])
+    df["dia"] = df["ts"].str[:10]
+    return df
+
+
+def resumen(df):
+    # p50/p95/cantidad por día, componente y etapa
+    if df.empty:
+        return pd.DataFrame(columns=["dia", "componente", "etapa", "n", "p50", "p95"])
+    agrupado = df.groupby(["componente", "etapa", "dia"])["segundos"]
+    tabla = pd.DataFrame({
+        "n": agrupado.size(),
+        "p50": agrupado.quantile(0.5),
+        "p95": agrupado.quantile(0.95),
+    }).reset_index()
+    return tabla.sort_values(["componente", "etapa", "dia"], ignore_index=True)
+
+
+def regresiones(tabla):
+    # Último día de cada etapa contra la mediana de sus p95 anteriores
+    alertas = []
+    for (componente, etapa), grupo in tabla.groupby(["componente", "etapa"]):
+        if len(grupo) < 2:
+            continue
+        ultimo = grupo.iloc[-1]
+        referencia = grupo.iloc[:-1]["p95"].median()
+        if referencia > 0 and ultimo["p95"] > FACTOR_REGRESION * referencia:
+            alertas.append((componente, etapa, ultimo["dia"], ultimo["p95"], referencia))
+    return alertas
+
+
+def imprimir_reporte(tabla):
+    if tabla.empty:
+        print("ℹ️ No hay métricas registradas.")
+        return
+    for (componente, etapa), grupo in tabla.groupby(["componente", "etapa"]):
+        print(f"\n📊 {componente}/{etapa}")
+        for _, fila in grupo.iterrows():
+            print(f"   {fila['dia']}  n={fila['n']:>5}  p50={fila['p50'] * 1000:>9.1f} ms  p95={fila['p95'] * 1000:>9.1f} ms")
+    alertas = regresiones(tabla)
+    if alertas:
+        print("\n⚠️ Posibles regresiones (p95 del último día vs. mediana de los anteriores):")
+        for componente, etapa, dia, p95, referencia in alertas:
+            print(f"   {componente}/{etapa} {dia}: {p95 * 1000:.1f} ms vs {referencia * 1000:.1f} ms")
+
+
+def exportar_prometheus(df, ruta):
+    # Resumen del último día en formato texto de Prometheus (para un textfile collector)
+    lineas = [
+        "# HELP precios_duracion_segundos Duración de cada etapa del circuito de precios.",
+        "# TYPE precios_duracion_segundos summary",
+    ]
+    if not df.empty:
+        ultimo = df[df["dia"] == df["dia"].max()]
+        for (componente, etapa), grupo in ultimo.groupby(["componente", "etapa"]):
+            etiquetas = f'componente="{componente}",etapa="{etapa}"'
+            for q in (0.5, 0.95):
+                lineas.append(f'precios_duracion_segundos{{{etiquetas},quantile="{q}"}} {grupo["segundos"].quantile(q):.6f}')
+            lineas.append(f"precios_duracion_segundos_sum{{{etiquetas}}} {grupo['segundos'].sum():.6f}")
+            lineas.append(f"precios_duracion_segundos_count{{{etiquetas}}} {len(grupo)}")
+
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    tmp_path = ruta + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lineas) + "\n")
+    os.replace(tmp_path, ruta)
+    print(f"📁 Métricas en formato Prometheus: {ruta}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reporte de p50/p95 por etapa y por día (scraping, unificación y dashboard).")
+    parser.add_argument("--dias", type=int, default=14, help="Cantidad de días hacia atrás")
+    parser.add_argument("--componente", choices=["scraper", "unificacion", "dashboard", "alertas", "api"], help="Solo un componente")
+    parser.add_argument("--prometheus", metavar="RUTA", help="Además, escribe el último día en formato Prometheus")
+    args = parser.parse_args()
+
+    df = leer(args.dias)
+    if args.componente:
+        df = df[df["componente"] == args.componente]
+    imprimir_reporte(resumen(df))
+    if args.prometheus:
+        exportar_prometheus(df, args.prometheus)
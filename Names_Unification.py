@@ -1,108 +1,85 @@
 import pandas as pd
-import numpy as np
-import re
 import os
-from datetime import datetime
+import json
+import hashlib
+import argparse
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from Precios import normalizar_precios
+import Price_Store
+import Price_Aggregates
+import Price_Snapshot
+import Alertas
+import Product_Matching
+import Metricas
+import Raw_Store
+from Categorias import CATEGORIAS
 
 pd.set_option('display.max_colwidth', 200)
 
-def parse_price(price):
-    if pd.isna(price):
-        return np.nan
-    price_str = str(price)
-    price_str = price_str.replace('$', '').replace('.', '').strip()
-    price_str = price_str.replace(',', '.')
-    try:
-        return float(price_str)
-    except ValueError:
-        return np.nan
-
-def unify_products(filepath, product_column, unification_map):
+def unify_products(filepath, product_column, unification_map, motor=None):
     filename = os.path.basename(filepath)
-    match = re.match(r'(\w+)_raw_(\d{4}-\d{2}-\d{2})\.csv', filename)
+    datos = Raw_Store.partes(filename)
 
-    if not match:
+    if not datos:
         print(f"⚠️ Nombre de archivo inesperado: {filename}")
         return None, None
 
-    supermercado = match.group(1)
-    fecha_str = match.group(2)
+    supermercado, _, fecha_str = datos
 
-    df = pd.read_csv(filepath)
+    # Foto completa o delta: en los dos casos se lee la vista completa del día
+    with Metricas.medir("unificacion", "lectura", fecha=fecha_str, archivo=filename):
+        df = Raw_Store.leer(filepath)
     df['fecha'] = fecha_str
     df['supermercado'] = supermercado
 
-    reverse_map = {}
-    for canonical, variants in unification_map.items():
-        for variant in variants:
-            reverse_map[variant] = canonical
-    df['producto'] = df[product_column].map(reverse_map).fillna(df[product_column])
-    df['precio'] = df['precio'].apply(parse_price)
+    with Metricas.medir("unificacion", "mapeo", fecha=fecha_str, archivo=filename):
+        if motor is not None:
+            # Motor de matching: el mapa manual manda y cada nombre distinto se decide una sola vez
+            reverse_map = {n: Product_Matching.canonico(motor, n, supermercado) for n in df[product_column].dropna().unique()}
+        else:
+            reverse_map = {}
+            for canonical, variants in unification_map.items():
+                for variant in variants:
+                    reverse_map[variant] = canonical
+        df['producto'] = df[product_column].map(reverse_map).fillna(df[product_column])
+        df['precio'] = normalizar_precios(df['precio'])
 
     df = df[['fecha', 'supermercado', 'producto', 'precio']]
     return fecha_str, df
 
-# --- Mapa de unificación editable ---
-unification_map_quesos = {
-    'Queso Cremoso Cremón La Serenísima x 1 kg.': [
-        'Queso Cremón La Serenísima cremoso fraccionado x kg',
-        'Queso Cremón Cremoso La Serenísima - Unidad Aprox. 500g',
-        'Queso Cremón Cremoso Paquete Por Kg',
-        'Queso Cremoso Cremón La Serenísima x 1 kg.'
-    ],
-    'Queso Cremoso La Paulina x 1 kg.': [
-        'Queso Cremoso Fraccionado LA PAULINA Xkg',
-        'Queso Cremoso La Paulina Trozado 1kgs',
-        'Queso cremoso La Paulina x kg.'
-    ],
-    'Queso Cremoso Cremón Horma La Serenísima x 1 Kg.': [
-        'Queso cremoso Silvia fraccionado x kg.',
-        'Queso cremoso Silvia media horma',
-        'Queso Cremon Cremoso La Serenisima Fraccionado Aprox 1 Kg'
-    ],
-    'Queso Cremoso fraccionado Punta del Agua x Kg.': [
-        'Queso Cremoso H./Fraccionado Punta del Agua x 1 Kg.',
-        'Queso Cremoso PUNTA DEL AGUA X Kg',
-        'Queso Cremoso Punta Del Agua Horma X Kg'
-    ],
-    'Queso Cremoso Cremón Doble Crema Fraccionado La Serenísima x 1 kg.': [
-        'Queso Cremoso Cremón Doble Crema Fraccionado La Serenísima x 1 kg.',
-        'Queso doble crema cremon fracc La serenísima x kg.'
-    ],
-    'Queso Cremoso Trozado Punta del Agua x 1 kg.': [
-        'Queso Cremoso Trozado Punta del Agua x 1 kg.',
-        'Queso Cremoso Fraccionado Punta Del A . 1 Kgm'
-    ],
-    'Queso Cremoso La Paulina Doble Crema x kg.': [
-        'Queso Cremoso La Paulina Doble Crema Paquete 1 Kg',
-        'Queso Cremoso Doble Crema Fraccionado La Paulina x 1 Kg.',
-        'Queso cremoso La Paulina doble crema x kg.',
-        'Queso Cremoso Doble Crema LA PAULINA X Kg'
-    ]
-}
+# --- Mapa de unificación y exclusiones: por categoría en categorias.json ---
 
 # --- Configuración de carpetas y ejecución ---
+# Cada categoría tiene su carpeta: Data/Raw/<categoria>/ y Data/Prueba2/<categoria>/
 RAW_DATA_PATH     = os.path.join("Data", "Raw")
 CLEANED_DATA_PATH = os.path.join("Data", "Prueba2")
 PRODUCT_COLUMN     = 'nombre'
+MANIFEST_ARCHIVO  = "manifest_unificacion.json"
 
-# Agrupar archivos por fecha
-files_by_date = defaultdict(list)
-for filename in os.listdir(RAW_DATA_PATH):
-    if filename.endswith('.csv') and '_raw_' in filename:
-        match = re.search(r'(\d{4}-\d{2}-\d{2})', filename)
-        if match:
-            fecha = match.group(1)
-            files_by_date[fecha].append(filename)
-
-# Procesar y exportar uno por fecha
-for fecha_str, file_list in files_by_date.items():
+# Con al menos MIN_FECHAS_PARALELO fechas pendientes (p. ej. al cambiar el mapa) se reparten entre procesos
+PROCESOS = os.cpu_count() or 1
+MIN_FECHAS_PARALELO = 4
+
+def agrupar_por_fecha(raw_path):
+    # Agrupar archivos por fecha
+    files_by_date = defaultdict(list)
+    if not os.path.isdir(raw_path):
+        return files_by_date
+    for filename in os.listdir(raw_path):
+        datos = Raw_Store.partes(filename)
+        if datos:
+            files_by_date[datos[2]].append(filename)
+    return files_by_date
+
+def procesar_fecha(categoria, fecha_str, file_list, motor=None):
+    # Devuelve el formato largo (fecha, supermercado, producto, precio) de la fecha; no escribe nada
+    clave = categoria["clave"]
     all_dfs = []
-    for filename in file_list:
-        filepath = os.path.join(RAW_DATA_PATH, filename)
+    for filename in sorted(file_list):
+        filepath = os.path.join(RAW_DATA_PATH, clave, filename)
         try:
-            fecha_detectada, df = unify_products(filepath, PRODUCT_COLUMN, unification_map_quesos)
+            fecha_detectada, df = unify_products(filepath, PRODUCT_COLUMN, categoria["unificacion"], motor)
             if df is not None:
                 all_dfs.append(df)
         except Exception as e:
@@ -111,32 +88,229 @@ for fecha_str, file_list in files_by_date.items():
     if all_dfs:
         result_df = pd.concat(all_dfs, ignore_index=True)
 
-        # 🚫 Filtrar productos no deseados
-        excluir_productos = [
-            'Cremoso vegano Felices Las Vacas 500 g.',
-            'Queso cremoso Cremón x kg.',
-            'Cremoso vegano Biorganic 500 g.',
-            'Cremoso Base De Almendras Felices Las Vacas 500 Gr Felices Las Vacas',
-            'Queso Untable Adler Cremoso Con Salame 190gr'
-        ]
-
-        result_df = result_df[~result_df['producto'].isin(excluir_productos)]
-
-
-        # 💡 Pivot para tener columnas por supermercado
-        df_pivot = result_df.pivot_table(
-            index=['fecha', 'producto'],
-            columns='supermercado',
-            values='precio',
-            aggfunc='first'  # o 'mean' si hay múltiples registros
-        ).reset_index()
-
-        # Ordenar columnas
-        cols_order = ['fecha', 'producto'] + sorted([col for col in df_pivot.columns if col not in ['fecha', 'producto']])
-        df_pivot = df_pivot[cols_order]
-
-        # 📝 Exportar CSV final
-        os.makedirs(CLEANED_DATA_PATH, exist_ok=True)
-        output_filepath = os.path.join(CLEANED_DATA_PATH, f"productos_unificados_{fecha_str}.csv")
-        df_pivot.to_csv(output_filepath, index=False, encoding='utf-8')
+        # 🚫 Filtrar productos no deseados (el Pipeline ya los descarta al scrapear; esto cubre los crudos viejos)
+        result_df = result_df[~result_df['producto'].isin(categoria["excluir_productos"])]
+
+        # 📦 Un precio por producto y supermercado: el primero con precio, como el viejo aggfunc='first'
+        return result_df.dropna(subset=['precio']).drop_duplicates(subset=['fecha', 'supermercado', 'producto'])
+
+def exportar_anchos(clave, procesadas):
+    # 💡 Formato ancho (una columna por supermercado) de todas las fechas procesadas en una sola
+    # pasada vectorizada; después se corta por fecha para el CSV de cada día
+    df_long = pd.concat(procesadas.values(), ignore_index=True)
+    with Metricas.medir("unificacion", "pivot", categoria=clave, fechas=len(procesadas)):
+        ancho = df_long.set_index(['fecha', 'producto', 'supermercado'])['precio'].unstack('supermercado')
+        ancho = ancho[sorted(ancho.columns)]
+        por_fecha = dict(tuple(ancho.groupby(level='fecha', sort=False)))
+
+    cleaned_path = os.path.join(CLEANED_DATA_PATH, clave)
+    os.makedirs(cleaned_path, exist_ok=True)
+    for fecha_str in sorted(procesadas):
+        dia = por_fecha.get(fecha_str)
+        if dia is None:
+            df_pivot = pd.DataFrame(columns=['fecha', 'producto'])
+        else:
+            # Solo los supermercados con precio ese día
+            df_pivot = dia.dropna(axis=1, how='all').reset_index()
+
+        # 📝 Exportar CSV final (temporal + rename: nunca queda un CSV a medio escribir)
+        output_filepath = os.path.join(cleaned_path, f"productos_unificados_{fecha_str}.csv")
+        with Metricas.medir("unificacion", "escritura", categoria=clave, fecha=fecha_str):
+            tmp_path = output_filepath + ".tmp"
+            df_pivot.to_csv(tmp_path, index=False, encoding='utf-8')
+            os.replace(tmp_path, output_filepath)
         print(f"✅ Archivo tabulado generado: {output_filepath}")
+
+def guardar_fechas(clave, procesadas):
+    # El formato largo es el canónico: una escritura por partición mes/supermercado del almacén
+    # y el ancho se deriva una sola vez para los CSV por fecha
+    if not procesadas:
+        return
+    with Metricas.medir("unificacion", "almacen", categoria=clave, fechas=len(procesadas)):
+        Price_Store.agregar(pd.concat(procesadas.values(), ignore_index=True), clave)
+    exportar_anchos(clave, procesadas)
+
+# --- Modo incremental: manifest con hash/mtime de cada archivo crudo y versión del mapa ---
+def version_mapa(categoria):
+    # Cambia si se edita el mapa de unificación, la lista de exclusión o la configuración del motor
+    return Product_Matching.version_motor(categoria)
+
+def hash_archivo(filepath):
+    h = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 16), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+def ruta_manifest(clave):
+    return os.path.join(CLEANED_DATA_PATH, clave, MANIFEST_ARCHIVO)
+
+def cargar_manifest(clave):
+    if not os.path.exists(ruta_manifest(clave)):
+        return {"version_mapa": None, "fechas": {}}
+    with open(ruta_manifest(clave), encoding='utf-8') as f:
+        return json.load(f)
+
+def guardar_manifest(clave, manifest):
+    os.makedirs(os.path.join(CLEANED_DATA_PATH, clave), exist_ok=True)
+    tmp_path = ruta_manifest(clave) + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, ruta_manifest(clave))
+
+def firma_fecha(raw_path, file_list, anterior):
+    # mtime/tamaño son baratos; solo se recalcula el hash si alguno de los dos cambió.
+    # Un delta firma también su cadena (foto + deltas previos), de la que depende su vista.
+    dependencias = set()
+    for filename in file_list:
+        dependencias.update(Raw_Store.dependencias(raw_path, filename))
+    firma = {}
+    for filename in sorted(dependencias):
+        stat = os.stat(os.path.join(raw_path, filename))
+        previo = anterior.get(filename)
+        if previo and previo["mtime"] == stat.st_mtime and previo["size"] == stat.st_size:
+            firma[filename] = previo
+        else:
+            firma[filename] = {
+                "mtime": stat.st_mtime,
+                "size": stat.st_size,
+                "sha1": hash_archivo(os.path.join(raw_path, filename)),
+            }
+    return firma
+
+def fecha_cambio(clave, fecha_str, firma, anterior):
+    output_filepath = os.path.join(CLEANED_DATA_PATH, clave, f"productos_unificados_{fecha_str}.csv")
+    if not os.path.exists(output_filepath):
+        return True
+    if set(firma) != set(anterior):
+        return True
+    return any(firma[f]["sha1"] != anterior[f]["sha1"] for f in firma)
+
+# --- Backfill en paralelo: las fechas pendientes se reparten entre procesos ---
+# Antes de procesar se resuelven juntos todos los nombres pendientes (solo se miran los nombres,
+# rápido) y se guarda la caché; cada proceso arma su motor una sola vez desde esa caché y solo
+# hace lookups.
+_MOTOR_WORKER = None
+
+def resolver_nombres(categoria, pendientes, motor):
+    # Todos los nombres de las fechas pendientes se deciden juntos antes de procesarlas
+    raw_path = os.path.join(RAW_DATA_PATH, categoria["clave"])
+    pares = []
+    for fecha_str, file_list, _ in pendientes:
+        for filename in sorted(file_list):
+            datos = Raw_Store.partes(filename)
+            if not datos:
+                continue
+            try:
+                nombres = Raw_Store.leer(os.path.join(raw_path, filename))[PRODUCT_COLUMN]
+            except Exception:
+                continue  # procesar_fecha informa el error del archivo
+            pares.extend((nombre, datos[0]) for nombre in nombres.dropna().unique())
+    Product_Matching.resolver(motor, pares)
+    Product_Matching.guardar(motor)
+
+def _iniciar_worker(clave):
+    global _MOTOR_WORKER
+    categoria = CATEGORIAS[clave]
+    _MOTOR_WORKER = Product_Matching.nuevo_motor(categoria, Product_Matching.ruta_cache(clave))
+
+def _procesar_fecha_worker(clave, fecha_str, file_list):
+    with Metricas.medir("unificacion", "fecha", categoria=clave, fecha=fecha_str):
+        df_long = procesar_fecha(CATEGORIAS[clave], fecha_str, file_list, _MOTOR_WORKER)
+    Metricas.volcar()  # los procesos del pool no pasan por atexit
+    return df_long
+
+def procesar_en_paralelo(categoria, pendientes, motor, procesos):
+    clave = categoria["clave"]
+    procesadas = {}
+    print(f"🧵 {clave}: {len(pendientes)} fechas en {procesos} procesos")
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_worker, initargs=(clave,)) as pool:
+        futuros = {pool.submit(_procesar_fecha_worker, clave, fecha_str, file_list): fecha_str
+                   for fecha_str, file_list, _ in pendientes}
+        for i, futuro in enumerate(as_completed(futuros), 1):
+            fecha_str = futuros[futuro]
+            df_long = futuro.result()
+            if df_long is not None:
+                procesadas[fecha_str] = df_long
+            print(f"⏳ {clave}: {i}/{len(pendientes)} fechas ({fecha_str})")
+    return procesadas
+
+def unificar_categoria(categoria, completo=False, procesos=None):
+    clave = categoria["clave"]
+    raw_path = os.path.join(RAW_DATA_PATH, clave)
+    files_by_date = agrupar_por_fecha(raw_path)
+    if not files_by_date:
+        return
+
+    manifest = cargar_manifest(clave)
+    version = version_mapa(categoria)
+
+    # Si cambió el mapa (o se pide explícitamente) se reprocesa toda la historia de la categoría
+    reconstruir = completo or manifest["version_mapa"] != version
+    if reconstruir:
+        if not completo and manifest["version_mapa"] is not None:
+            print(f"🔁 Cambió el mapa de unificación de {clave}, se reprocesan todas las fechas.")
+        manifest = {"version_mapa": version, "fechas": {}}
+
+    motor = Product_Matching.nuevo_motor(categoria, Product_Matching.ruta_cache(clave))
+
+    pendientes = []
+    for fecha_str, file_list in sorted(files_by_date.items()):
+        anterior = manifest["fechas"].get(fecha_str, {})
+        firma = firma_fecha(raw_path, file_list, anterior)
+        if fecha_cambio(clave, fecha_str, firma, anterior):
+            pendientes.append((fecha_str, file_list, firma))
+
+    resolver_nombres(categoria, pendientes, motor)
+    procesos = procesos or PROCESOS
+    if procesos > 1 and len(pendientes) >= MIN_FECHAS_PARALELO:
+        procesadas = procesar_en_paralelo(categoria, pendientes, motor, min(procesos, len(pendientes)))
+    else:
+        procesadas = {}
+        for fecha_str, file_list, _ in pendientes:
+            with Metricas.medir("unificacion", "fecha", categoria=clave, fecha=fecha_str):
+                df_long = procesar_fecha(categoria, fecha_str, file_list, motor)
+            if df_long is not None:
+                procesadas[fecha_str] = df_long
+    guardar_fechas(clave, procesadas)
+    for fecha_str, _, firma in pendientes:
+        manifest["fechas"][fecha_str] = firma
+
+    # 📐 Agregados: se suman solo los días nuevos, salvo que se haya reprocesado todo
+    with Metricas.medir("unificacion", "agregados", categoria=clave):
+        if reconstruir:
+            Price_Aggregates.reconstruir(clave)
+        else:
+            Price_Aggregates.actualizar(clave, procesadas)
+
+    # 🗂️ Foto Arrow del histórico para el arranque del dashboard
+    if procesadas or reconstruir or Price_Snapshot.actual(clave) is None:
+        with Metricas.medir("unificacion", "snapshot", categoria=clave):
+            Price_Snapshot.escribir(clave)
+
+    # 🔔 Alertas: solo las fechas nuevas (o la última, si se reprocesó el mismo día); tras reprocesar
+    # todo el estado se rearma con los canónicos nuevos en lugar de compararlos contra los viejos
+    Alertas.procesar(clave, procesadas, reconstruido=reconstruir)
+
+    Product_Matching.guardar(motor)
+    guardar_manifest(clave, manifest)
+    # Se cuentan por separado: una fecha pendiente que no dio resultados no es una fecha sin cambios
+    sin_cambios = len(files_by_date) - len(pendientes)
+    fallidas = len(pendientes) - len(procesadas)
+    print(f"📦 {clave}: {len(procesadas)} fechas procesadas, {sin_cambios} sin cambios"
+          + (f", {fallidas} sin resultados." if fallidas else "."))
+
+def unificar(completo=False, categorias=None, procesos=None):
+    # Cada categoría es independiente: sus crudos, su mapa, su manifest y sus particiones
+    for clave in categorias or list(CATEGORIAS):
+        with Metricas.medir("unificacion", "categoria", categoria=clave, completo=completo):
+            unificar_categoria(CATEGORIAS[clave], completo, procesos)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Unifica los nombres de productos y genera un CSV tabulado por fecha.")
+    parser.add_argument("--completo", action="store_true", help="Reprocesa todas las fechas ignorando el manifest")
+    parser.add_argument("--categorias", nargs="+", choices=list(CATEGORIAS), help="Categorías a unificar (por defecto, todas)")
+    parser.add_argument("--procesos", type=int, default=PROCESOS, help="Procesos para reprocesar muchas fechas (1 = secuencial)")
+    args = parser.parse_args()
+
+    unificar(completo=args.completo, categorias=args.categorias, procesos=args.procesos)
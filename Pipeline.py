@@ -0,0 +1,272 @@
+import os
+import csv
+import math
+import shutil
+from collections import OrderedDict
+from datetime import datetime
+
+from Precios import normalizar_registros
+from Categorias import coincide
+import Product_Matching
+import Raw_Store
+from Raw_Store import COLUMNAS_RAW, COLUMNAS_DELTA
+
+# --- Pipeline de registros de scraping ---
+# Los scrapers entregan tandas de registros crudos {fecha, nombre, precio} (una por página) a un
+# generador asíncrono. Cada etapa es otro generador: filtro de la categoría, precios, nombre
+# canónico + exclusiones (salteados si la página es idéntica a una ya procesada), duplicados,
+# y la última escribe el crudo del día (foto completa o delta, ver Raw_Store) a medida que llegan.
+# El crudo se escribe en un temporal que recién al final reemplaza al archivo del día: una corrida
+# interrumpida no deja un CSV a medias, y una segunda corrida del mismo día se agrega en lugar de pisarlo.
+# Si una página agota los reintentos, las páginas completas se guardan como corrida parcial.
+
+# Nombres recordados para descartar duplicados: las páginas llegan en orden y los repetidos
+# aparecen cerca, así que alcanza con los últimos MAX_VISTOS y la memoria no crece con el resultado
+MAX_VISTOS = 100_000
+
+# Motor de matching por categoría (mapa fijo + caché de decisiones), se carga una vez por proceso
+_MOTORES = {}
+
+
+async def lotes_de(registros):
+    # Adapta una lista ya armada (p. ej. la respuesta de la API de VTEX) a la entrada del pipeline
+    if registros:
+        yield registros
+
+
+async def filtrar(lotes, categoria):
+    # Patrón de inclusión/exclusión de la categoría, compilado una sola vez en Categorias
+    async for lote in lotes:
+        lote = [r for r in lote if coincide(categoria, r["nombre"])]
+        if lote:
+            yield lote
+
+
+async def normalizar(lotes):
+    # Precios de toda la tanda en una sola pasada vectorizada
+    async for lote in lotes:
+        yield normalizar_registros(lote)
+
+
+async def deduplicar(lotes, maximo=MAX_VISTOS):
+    # Se queda con la primera aparición de cada nombre (las páginas llegan en orden)
+    vistos = OrderedDict()
+    async for lote in lotes:
+        nuevos = []
+        for registro in lote:
+            if registro["nombre"] in vistos:
+                vistos.move_to_end(registro["nombre"])
+                continue
+            vistos[registro["nombre"]] = None
+            if len(vistos) > maximo:
+                vistos.popitem(last=False)
+            nuevos.append(registro)
+        if nuevos:
+            yield nuevos
+
+
+def motor_categoria(categoria):
+    clave = categoria["clave"]
+    if clave not in _MOTORES:
+        _MOTORES[clave] = Product_Matching.nuevo_motor(categoria, Product_Matching.ruta_cache(clave))
+    return _MOTORES[clave]
+
+
+async def canonizar(lotes, categoria, tienda):
+    # Agrega el nombre canónico y descarta los productos excluidos de la categoría.
+    # Names_Unification sigue partiendo de "nombre", así un cambio de mapa reprocesa la historia.
+    motor = motor_categoria(categoria)
+    excluir = set(categoria["excluir_productos"])
+    async for lote in lotes:
+        salida = []
+        for registro in lote:
+            registro["producto"] = Product_Matching.canonico(motor, registro["nombre"], tienda)
+            if registro["producto"] not in excluir:
+                salida.append(registro)
+        if salida:
+            yield salida
+
+
+async def _preparar(lote, categoria, tienda):
+    # Filtro, precios y nombre canónico de una sola página
+    return [registro async for salida in canonizar(normalizar(filtrar(lotes_de(lote), categoria)), categoria, tienda)
+            for registro in salida]
+
+
+async def reusar_paginas(lotes, categoria, tienda, previas, nuevas):
+    # Una página con el mismo bloque de nombres y precios que una ya procesada (corrida anterior)
+    # reutiliza esos registros; `nuevas` junta las huellas de esta corrida para la próxima
+    async for lote in lotes:
+        if not lote:
+            continue
+        clave_huella = Raw_Store.huella(lote)
+        procesados = previas.get(clave_huella)
+        if procesados is None:
+            procesados = await _preparar(lote, categoria, tienda)
+        else:
+            nuevas["reusadas"] = nuevas.get("reusadas", 0) + 1
+        nuevas.setdefault("paginas", {})[clave_huella] = procesados
+        if procesados:
+            fecha = lote[0]["fecha"]
+            yield [{**registro, "fecha": fecha} for registro in procesados]
+
+
+async def diferencias(lotes, anterior, resumen):
+    # Solo salen las altas y los cambios de precio o de nombre canónico contra la vista anterior;
+    # al final, las bajas. Cada página produce una tanda (aunque vacía) para que el delta del día exista.
+    vistos = set()
+    fecha = None
+    async for lote in lotes:
+        salida = []
+        for registro in lote:
+            vistos.add(registro["nombre"])
+            fecha = registro["fecha"]
+            previo = anterior.get(registro["nombre"])
+            if previo is None:
+                salida.append({**registro, "cambio": "alta"})
+            elif not Raw_Store.mismo_registro(previo, registro):
+                salida.append({**registro, "cambio": "precio"})
+        resumen["cambios"] += len(salida)
+        yield salida
+
+    # Sin registros no hay bajas: una corrida fallida no vacía el catálogo
+    if vistos:
+        bajas = [
+            {"fecha": fecha, "nombre": nombre, "precio": "", "producto": previo.get("producto"), "cambio": "baja"}
+            for nombre, previo in anterior.items() if nombre not in vistos
+        ]
+        resumen["cambios"] += len(bajas)
+        if bajas:
+            yield bajas
+    resumen["productos"] = len(vistos)
+
+
+def _fila(registro):
+    # NaN (precio sin parsear, canónico de una baja) se escribe como celda vacía
+    return {k: "" if isinstance(v, float) and math.isnan(v) else v for k, v in registro.items()}
+
+
+def _abrir_temporal(ruta, tmp_path, columnas, agregar):
+    # Para agregar se parte de una copia del archivo actual; si es de antes de la columna
+    # "corrida" (u otro esquema) se reescribe con las columnas nuevas
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    if agregar and os.path.exists(ruta):
+        with open(ruta, encoding="utf-8-sig", newline="") as f:
+            encabezado = next(csv.reader(f), [])
+        if encabezado == columnas:
+            shutil.copyfile(ruta, tmp_path)
+        else:
+            with open(ruta, encoding="utf-8-sig", newline="") as origen, open(tmp_path, "w", encoding="utf-8-sig", newline="") as destino:
+                writer = csv.DictWriter(destino, fieldnames=columnas, restval="", extrasaction="ignore")
+                writer.writeheader()
+                writer.writerows(csv.DictReader(origen))
+        f = open(tmp_path, "a", encoding="utf-8-sig", newline="")
+        return f, csv.DictWriter(f, fieldnames=columnas, extrasaction="ignore")
+
+    f = open(tmp_path, "w", encoding="utf-8-sig", newline="")
+    writer = csv.DictWriter(f, fieldnames=columnas, extrasaction="ignore")
+    writer.writeheader()
+    return f, writer
+
+
+def _marcar_parcial(tmp_path, columnas, corrida):
+    # Las filas de esta corrida pasan a "<corrida> parcial"; las de corridas anteriores no cambian
+    parcial_path = tmp_path + ".parcial"
+    with open(tmp_path, encoding="utf-8-sig", newline="") as origen, open(parcial_path, "w", encoding="utf-8-sig", newline="") as destino:
+        writer = csv.DictWriter(destino, fieldnames=columnas, extrasaction="ignore")
+        writer.writeheader()
+        for fila in csv.DictReader(origen):
+            if fila["corrida"] == corrida:
+                fila["corrida"] = corrida + Raw_Store.PARCIAL
+            writer.writerow(fila)
+    os.replace(parcial_path, tmp_path)
+
+
+async def escribir_csv(lotes, ruta, columnas=COLUMNAS_RAW, corrida=None, agregar=False):
+    # Escribe cada tanda apenas llega en un temporal que al terminar reemplaza a `ruta` (sin
+    # resultados no hay archivo). Con `agregar` las filas van después de las de corridas anteriores.
+    # Un error de la corrida (una página sin más reintentos) corta la paginación: lo escrito hasta
+    # ahí se guarda como corrida parcial y el error sigue hacia el scraper. Las etapas terminan con
+    # el error, así que un delta parcial no lleva bajas.
+    cantidad = 0
+    f = None
+    tmp_path = ruta + ".tmp"
+    try:
+        async for lote in lotes:
+            if f is None:
+                f, writer = _abrir_temporal(ruta, tmp_path, columnas, agregar)
+            writer.writerows(_fila({**registro, "corrida": corrida}) for registro in lote)
+            f.flush()
+            cantidad += len(lote)
+    except Exception:
+        if f is not None:
+            f.close()
+            _marcar_parcial(tmp_path, columnas, corrida)
+            os.replace(tmp_path, ruta)
+            print(f"⚠️ {cantidad} registros guardados como corrida parcial en {ruta}")
+        raise
+    except BaseException:
+        # Una corrida interrumpida (Ctrl+C, cancelación) no toca el archivo del día (el journal permite retomarla)
+        if f is not None:
+            f.close()
+            os.remove(tmp_path)
+        raise
+    if f is not None:
+        f.close()
+        os.replace(tmp_path, ruta)
+    return cantidad
+
+
+async def contar(lotes):
+    cantidad = 0
+    async for lote in lotes:
+        cantidad += len(lote)
+    return cantidad
+
+
+async def escribir_crudo(etapas, tienda, clave, fecha, corrida):
+    # Foto completa cada DIAS_COMPLETO días (o si no hay base); si no, solo el delta contra la vista anterior.
+    # Si el día ya tiene crudo, la corrida se agrega a ese archivo: otra foto completa o el delta
+    # contra la vista que dejaron las corridas anteriores del día.
+    del_dia = Raw_Store.tipo_del_dia(clave, tienda, fecha)
+    if del_dia == "delta":
+        base = Raw_Store.vista(clave, tienda, fecha)
+    elif del_dia == "raw" or Raw_Store.necesita_foto(clave, tienda, fecha):
+        base = None
+    else:
+        base = Raw_Store.anterior(clave, tienda, fecha)
+
+    if base is None:
+        ruta = Raw_Store.ruta(tienda, clave, fecha, "raw")
+        cantidad = await escribir_csv(etapas, ruta, corrida=corrida, agregar=del_dia == "raw")
+        if cantidad:
+            Raw_Store.descartar(tienda, clave, fecha, "delta")
+            print(f"📁 {tienda}/{clave}: {cantidad} productos guardados en {ruta}")
+        return cantidad
+
+    ruta = Raw_Store.ruta(tienda, clave, fecha, "delta")
+    resumen = {"cambios": 0, "productos": 0}
+    await escribir_csv(diferencias(etapas, base, resumen), ruta, COLUMNAS_DELTA, corrida, agregar=del_dia == "delta")
+    if resumen["productos"]:
+        Raw_Store.descartar(tienda, clave, fecha, "raw")
+        print(f"📁 {tienda}/{clave}: {resumen['productos']} productos, {resumen['cambios']} cambios guardados en {ruta}")
+    return resumen["productos"]
+
+
+async def procesar(lotes, tienda, categoria, guardar=True):
+    # Arma la cadena de etapas sobre las tandas crudas y la consume; devuelve cuántos productos salieron
+    clave = categoria["clave"]
+    # Sin guardar (benchmark) no se usan huellas: se mide el trabajo completo
+    previas = Raw_Store.cargar_huellas(tienda, clave).get("paginas", {}) if guardar else {}
+    nuevas = {}
+    etapas = deduplicar(reusar_paginas(lotes, categoria, tienda, previas, nuevas))
+    if not guardar:
+        return await contar(etapas)
+
+    ahora = datetime.now()
+    cantidad = await escribir_crudo(etapas, tienda, clave, ahora.strftime('%Y-%m-%d'), ahora.isoformat(timespec="seconds"))
+    if cantidad:
+        Raw_Store.guardar_huellas(tienda, clave, {"paginas": nuevas.get("paginas", {})})
+    if nuevas.get("reusadas"):
+        print(f"♻️ {tienda}/{clave}: {nuevas['reusadas']} páginas sin cambios reutilizadas")
+    return cantidad
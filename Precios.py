@@ -0,0 +1,94 @@
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Formato argentino completo: miles con punto y decimales opcionales con coma ("14.900" / "14.900,50")
+PATRON_MILES = r"-?\d{1,3}(?:\.\d{3})+(?:,\d+)?"
+PATRON_NUMERO = r"-?\d+(?:\.\d+)?"
+
+
+def normalizar_precios(serie):
+    # Convierte una columna completa de precios a float con kernels de pyarrow sobre un solo array
+    # (sin pasar por Series intermedias). Acepta "$ 14.900,50", "14900,50", "14.900", "14900" y
+    # también "14190.50" (punto decimal).
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(float)
+
+    s = pa.array(serie.astype("string[pyarrow]"))
+    for simbolo in ("$", " ", "\xa0"):
+        s = pc.replace_substring(s, simbolo, "")
+
+    # Con coma o con puntos de miles el punto es separador de miles y la coma el decimal
+    argentino = pc.or_(pc.match_substring(s, ","), pc.match_substring_regex(s, f"^{PATRON_MILES}$"))
+    s = pc.if_else(argentino, pc.replace_substring(pc.replace_substring(s, ".", ""), ",", "."), s)
+
+    # Lo que no quede como número válido pasa a NaN
+    s = pc.if_else(pc.match_substring_regex(s, f"^{PATRON_NUMERO}$"), s, None)
+    return pd.Series(pc.cast(s, pa.float64()).to_numpy(zero_copy_only=False), index=serie.index)
+
+
+def normalizar_registros(registros):
+    # Normaliza en un solo paso el campo "precio" de una tanda de registros de scraping
+    if registros:
+        precios = normalizar_precios(pd.Series([r["precio"] for r in registros], dtype=object))
+        for registro, precio in zip(registros, precios):
+            registro["precio"] = precio
+    return registros
+
+
+def parse_price(price):
+    # Versión fila por fila anterior, se mantiene solo como referencia para el benchmark
+    if pd.isna(price):
+        return np.nan
+    price_str = str(price)
+    price_str = price_str.replace('$', '').replace('.', '').strip()
+    price_str = price_str.replace(',', '.')
+    try:
+        return float(price_str)
+    except ValueError:
+        return np.nan
+
+
+def precios_sinteticos(n, semilla=0):
+    # Mezcla de los formatos que aparecen en Data/Raw y en el texto crudo de las páginas
+    rng = np.random.default_rng(semilla)
+    valores = rng.integers(1_000, 60_000, n)
+    centavos = rng.integers(0, 100, n)
+    formatos = rng.integers(0, 4, n)
+    precios = np.where(formatos == 0, valores.astype(str), "")
+    precios = np.where(formatos == 1, [f"$ {v:,}".replace(",", ".") for v in valores], precios)
+    precios = np.where(formatos == 2, [f"$ {v // 1000}.{v % 1000:03d},{c:02d}" for v, c in zip(valores, centavos)], precios)
+    precios = np.where(formatos == 3, [f"{v},{c:02d}" for v, c in zip(valores, centavos)], precios)
+    return pd.Series(precios)
+
+
+def mejor_tiempo(funcion, serie, repeticiones):
+    # El mínimo de varias pasadas, así el ruido de la máquina no decide la comparación
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(serie)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos), resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de normalizar_precios contra el parse_price fila por fila.")
+    parser.add_argument("--filas", type=int, nargs="+", default=[50, 2_000, 200_000, 1_000_000],
+                        help="Tamaños a medir (50 es una página de scraping)")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    for filas in args.filas:
+        serie = precios_sinteticos(filas)
+        t_apply, anterior = mejor_tiempo(lambda s: s.apply(parse_price), serie, args.repeticiones)
+        t_vectorizado, nuevo = mejor_tiempo(normalizar_precios, serie, args.repeticiones)
+
+        print(f"📊 {filas:,} precios sintéticos (mejor de {args.repeticiones})")
+        print(f"  apply(parse_price):   {t_apply * 1000:.2f}ms")
+        print(f"  normalizar_precios:   {t_vectorizado * 1000:.2f}ms ({t_apply / t_vectorizado:.2f}x)")
+        print(f"  coinciden: {np.isclose(anterior, nuevo, equal_nan=True).mean():.1%}")
@@ -0,0 +1,172 @@
+import os
+import json
+import argparse
+
+import pandas as pd
+
+import Price_Store
+from Categorias import CATEGORIAS, CATEGORIA_DEFECTO
+
+# --- Agregados materializados (se actualizan después de cada unificación) ---
+# Data/Agregados/<categoria>/{historico.parquet, ventana.parquet, fechas.json}
+AGREGADOS_PATH = os.path.join("Data", "Agregados")
+HISTORICO = "historico.parquet"
+VENTANA = "ventana.parquet"
+FECHAS = "fechas.json"
+
+DIAS_VENTANA = 30
+CLAVES = ['producto', 'supermercado']
+COLUMNAS_HISTORICO = CLAVES + ['suma', 'cantidad', 'minimo', 'maximo', 'ultima_fecha', 'media_7d', 'media_30d']
+
+
+def ruta(categoria, archivo):
+    return os.path.join(AGREGADOS_PATH, categoria, archivo)
+
+
+def _escribir(df, ruta):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    tmp_path = ruta + ".tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, ruta)
+
+
+def leer_historico(categoria):
+    if not os.path.exists(ruta(categoria, HISTORICO)):
+        return pd.DataFrame(columns=COLUMNAS_HISTORICO)
+    return pd.read_parquet(ruta(categoria, HISTORICO))
+
+
+def leer_ventana(categoria):
+    # Últimos DIAS_VENTANA días de cada producto (contados desde su última fecha), formato largo
+    if not os.path.exists(ruta(categoria, VENTANA)):
+        return pd.DataFrame(columns=['fecha', 'supermercado', 'producto', 'precio'])
+    return pd.read_parquet(ruta(categoria, VENTANA))
+
+
+def _fechas_incluidas(categoria):
+    if not os.path.exists(ruta(categoria, FECHAS)):
+        return set()
+    with open(ruta(categoria, FECHAS), encoding='utf-8') as f:
+        return set(json.load(f))
+
+
+def _recortar_ventana(ventana):
+    # Se queda con los últimos DIAS_VENTANA días de cada producto, como el gráfico del dashboard
+    ultima = ventana.groupby('producto')['fecha'].transform('max')
+    return ventana[ventana['fecha'] >= ultima - pd.Timedelta(days=DIAS_VENTANA)].reset_index(drop=True)
+
+
+def _medias_moviles(historico, ventana):
+    # Medias de 7 y 30 días por producto/supermercado, calculadas sobre la ventana (chica)
+    ultima = ventana.groupby('producto')['fecha'].transform('max')
+    medias = []
+    for dias in (7, DIAS_VENTANA):
+        en_rango = ventana[ventana['fecha'] >= ultima - pd.Timedelta(days=dias)]
+        medias.append(en_rango.groupby(CLAVES)['precio'].mean().rename(f"media_{dias}d"))
+    historico = historico.drop(columns=['media_7d', 'media_30d'], errors='ignore').set_index(CLAVES)
+    return historico.join(medias).reset_index()[COLUMNAS_HISTORICO]
+
+
+def _guardar(categoria, historico, ventana, fechas):
+    _escribir(_medias_moviles(historico, ventana), ruta(categoria, HISTORICO))
+    _escribir(ventana, ruta(categoria, VENTANA))
+    fechas_path = ruta(categoria, FECHAS)
+    with open(fechas_path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(sorted(fechas), f)
+    os.replace(fechas_path + ".tmp", fechas_path)
+
+
+def reconstruir(categoria):
+    # Recalcula todo desde el almacén (cuando cambia el mapa o se reprocesa una fecha vieja)
+    df = Price_Store.leer(categoria)
+    historico = df.groupby(CLAVES)['precio'].agg(
+        suma='sum', cantidad='count', minimo='min', maximo='max'
+    )
+    historico['ultima_fecha'] = df.groupby(CLAVES)['fecha'].max()
+    ventana = _recortar_ventana(df)
+    _guardar(categoria, historico.reset_index(), ventana, set(df['fecha'].dt.strftime('%Y-%m-%d')))
+    print(f"📐 Agregados de {categoria} reconstruidos: {len(historico)} producto/supermercado")
+
+
+def _resumen_dia(df):
+    nuevo = df.groupby(CLAVES)['precio'].agg(suma='sum', cantidad='count', minimo='min', maximo='max')
+    nuevo['ultima_fecha'] = df.groupby(CLAVES)['fecha'].max()
+    return nuevo
+
+
+def _recalcular_extremos(categoria, historico, claves):
+    # Mínimo, máximo y última fecha de unas pocas claves, leyendo del almacén solo esos productos
+    df = Price_Store.leer(categoria, productos={producto for producto, _ in claves})
+    df = df.set_index(CLAVES).loc[lambda d: d.index.isin(list(claves))].reset_index()
+    extremos = df.groupby(CLAVES).agg(minimo=('precio', 'min'), maximo=('precio', 'max'), ultima_fecha=('fecha', 'max'))
+    sin_datos = [clave for clave in claves if clave not in extremos.index]
+    historico = historico.drop(index=sin_datos)
+    historico.loc[extremos.index, ['minimo', 'maximo', 'ultima_fecha']] = extremos
+    return historico
+
+
+def actualizar(categoria, dfs_por_fecha):
+    # Suma los días nuevos a los agregados existentes. Una fecha ya incluida (el recolector reunifica
+    # el día cada vez que llega una tienda) resta primero su aporte anterior, que está en la ventana;
+    # solo una fecha más vieja que la ventana obliga a reconstruir todo.
+    fechas = _fechas_incluidas(categoria)
+    if not os.path.exists(ruta(categoria, HISTORICO)):
+        reconstruir(categoria)
+        return
+    if not dfs_por_fecha:
+        return
+    limite = pd.Timestamp(max(fechas)) - pd.Timedelta(days=DIAS_VENTANA) if fechas else None
+    if any(fecha in fechas and pd.Timestamp(fecha) < limite for fecha in dfs_por_fecha):
+        reconstruir(categoria)
+        return
+
+    historico = leer_historico(categoria).drop(columns=['media_7d', 'media_30d']).set_index(CLAVES)
+    ventana = leer_ventana(categoria)
+    revisar = set()  # claves cuyo mínimo, máximo o última fecha pudo venir del aporte restado
+
+    for fecha_str, df in sorted(dfs_por_fecha.items()):
+        df = df[['fecha', 'supermercado', 'producto', 'precio']].dropna(subset=['precio']).copy()
+        df['fecha'] = pd.to_datetime(df['fecha'])
+        nuevo = _resumen_dia(df)
+
+        if fecha_str in fechas:
+            en_fecha = ventana['fecha'] == pd.Timestamp(fecha_str)
+            viejo = _resumen_dia(ventana[en_fecha])
+            historico.loc[viejo.index, 'suma'] -= viejo['suma']
+            historico.loc[viejo.index, 'cantidad'] -= viejo['cantidad']
+            actual = historico.loc[viejo.index]
+            cambiadas = viejo.index[
+                (viejo['minimo'] <= actual['minimo']) | (viejo['maximo'] >= actual['maximo'])
+                | (viejo['ultima_fecha'] >= actual['ultima_fecha'])
+            ]
+            revisar.update(cambiadas)
+            ventana = ventana[~en_fecha]
+
+        historico = historico.reindex(historico.index.union(nuevo.index))
+        previo = historico.loc[nuevo.index]
+        historico.loc[nuevo.index, 'suma'] = previo['suma'].fillna(0) + nuevo['suma']
+        historico.loc[nuevo.index, 'cantidad'] = previo['cantidad'].fillna(0) + nuevo['cantidad']
+        historico.loc[nuevo.index, 'minimo'] = pd.concat([previo['minimo'], nuevo['minimo']], axis=1).min(axis=1)
+        historico.loc[nuevo.index, 'maximo'] = pd.concat([previo['maximo'], nuevo['maximo']], axis=1).max(axis=1)
+        historico.loc[nuevo.index, 'ultima_fecha'] = pd.concat([previo['ultima_fecha'], nuevo['ultima_fecha']], axis=1).max(axis=1)
+
+        ventana = _recortar_ventana(pd.concat([ventana, df], ignore_index=True))
+        fechas.add(fecha_str)
+
+    if revisar:
+        historico = _recalcular_extremos(categoria, historico, revisar)
+    historico = historico[historico['cantidad'] > 0]
+    historico['cantidad'] = historico['cantidad'].astype(int)
+    _guardar(categoria, historico.reset_index(), ventana, fechas)
+    print(f"📐 Agregados de {categoria} actualizados con {len(dfs_por_fecha)} fechas")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agregados materializados de precios (promedios históricos y ventanas).")
+    parser.add_argument("--categoria", choices=list(CATEGORIAS), default=CATEGORIA_DEFECTO)
+    parser.add_argument("--reconstruir", action="store_true", help="Recalcula todo desde el almacén Parquet")
+    args = parser.parse_args()
+
+    if args.reconstruir:
+        reconstruir(args.categoria)
+    print(leer_historico(args.categoria).head(10).to_string())
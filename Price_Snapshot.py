@@ -0,0 +1,107 @@
+import os
+import glob
+import json
+import argparse
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+import Price_Store
+from Categorias import CATEGORIAS, CATEGORIA_DEFECTO
+
+# --- Foto compacta del histórico para el arranque del dashboard ---
+# Data/Snapshot/<categoria>/snapshot_<marca>.arrow: todo el formato largo en un Feather sin comprimir,
+# ordenado por fecha, con supermercado y producto como diccionario. El dashboard lo abre con memory
+# map (abrir no lee datos) y solo materializa las filas de la fecha o el producto que muestra.
+# El metadata "indice" trae el rango de filas de cada fecha y las listas de productos y supermercados.
+# Cada versión es un archivo nuevo: el que tenga abierto el dashboard nunca se reemplaza.
+SNAPSHOT_PATH = os.path.join("Data", "Snapshot")
+
+SCHEMA = pa.schema([
+    ("fecha", pa.date32()),
+    ("supermercado", pa.dictionary(pa.int32(), pa.string())),
+    ("producto", pa.dictionary(pa.int32(), pa.string())),
+    ("precio", pa.float64()),
+])
+
+
+def directorio(categoria):
+    return os.path.join(SNAPSHOT_PATH, categoria)
+
+
+def actual(categoria):
+    # Ruta de la versión más reciente, o None si el unificador todavía no escribió ninguna
+    versiones = sorted(glob.glob(os.path.join(directorio(categoria), "snapshot_*.arrow")))
+    return versiones[-1] if versiones else None
+
+
+def armar(df):
+    # Tabla Arrow (con su índice en el metadata) a partir del formato largo del almacén
+    df = df[['fecha', 'supermercado', 'producto', 'precio']].sort_values(['fecha', 'producto', 'supermercado'], ignore_index=True)
+    fechas = pd.to_datetime(df['fecha']).dt.strftime('%Y-%m-%d')
+    inicios = fechas.drop_duplicates()
+    fines = list(inicios.index[1:]) + [len(df)]
+    indice = {
+        "fechas": {fecha: [int(inicio), int(fin)] for fecha, inicio, fin in zip(inicios, inicios.index, fines)},
+        "productos": sorted(df['producto'].unique()),
+        "supermercados": sorted(df['supermercado'].unique()),
+    }
+
+    df = df.astype({'supermercado': 'category', 'producto': 'category'})
+    tabla = pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False)
+    return tabla.replace_schema_metadata({"indice": json.dumps(indice, ensure_ascii=False)})
+
+
+def escribir(categoria):
+    # Lo llama el unificador después de guardar las fechas; se borran las versiones viejas que se pueda
+    tabla = armar(Price_Store.leer(categoria))
+    os.makedirs(directorio(categoria), exist_ok=True)
+    anteriores = glob.glob(os.path.join(directorio(categoria), "snapshot_*.arrow"))
+
+    ruta = os.path.join(directorio(categoria), f"snapshot_{datetime.now().strftime('%Y%m%d%H%M%S%f')}.arrow")
+    tmp_path = os.path.join(directorio(categoria), "_snapshot.arrow.tmp")
+    feather.write_feather(tabla, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, ruta)
+
+    for vieja in anteriores:
+        try:
+            os.remove(vieja)
+        except OSError:
+            pass  # abierta por un dashboard (Windows): se borra en la próxima escritura
+    print(f"🗂️ Snapshot de {categoria}: {tabla.num_rows} registros en {ruta}")
+    return ruta
+
+
+def abrir(categoria):
+    # (ruta, tabla, indice) de la versión actual con memory map; sin foto se arma en memoria desde el almacén
+    ruta = actual(categoria)
+    tabla = feather.read_table(ruta, memory_map=True) if ruta else armar(Price_Store.leer(categoria))
+    return ruta, tabla, json.loads(tabla.schema.metadata[b"indice"])
+
+
+def a_pandas(tabla):
+    # Materializa un corte: fechas como datetime y nombres como texto (sin categorías no observadas)
+    df = tabla.to_pandas(date_as_object=False)
+    return df.astype({'supermercado': str, 'producto': str})
+
+
+def dia(tabla, indice, fecha):
+    inicio, fin = indice["fechas"].get(fecha, (0, 0))
+    return a_pandas(tabla.slice(inicio, fin - inicio))
+
+
+def fechas_producto(tabla, producto):
+    # Fechas en las que aparece un producto (solo se leen las columnas producto y fecha)
+    fechas = pc.unique(tabla['fecha'].filter(pc.equal(tabla['producto'], producto)))
+    return sorted(fecha.strftime('%Y-%m-%d') for fecha in fechas.to_pylist())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Foto Arrow del histórico de precios para el dashboard.")
+    parser.add_argument("--categoria", choices=list(CATEGORIAS), default=CATEGORIA_DEFECTO)
+    args = parser.parse_args()
+
+    escribir(args.categoria)
@@ -0,0 +1,149 @@
+import os
+import glob
+import argparse
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from Categorias import CATEGORIAS, CATEGORIA_DEFECTO
+
+# --- Almacén columnar de precios (formato largo) ---
+# Data/Parquet/categoria=queso_cremoso/mes=2025-08/supermercado=coto/precios.parquet
+STORE_PATH = os.path.join("Data", "Parquet")
+ARCHIVO_PARTICION = "precios.parquet"
+
+SCHEMA = pa.schema([
+    ("fecha", pa.date32()),
+    ("producto", pa.string()),
+    ("precio", pa.float64()),
+])
+PARTICIONES = ds.partitioning(
+    pa.schema([("mes", pa.string()), ("supermercado", pa.string())]),
+    flavor="hive",
+)
+
+
+def _ruta_categoria(categoria):
+    return os.path.join(STORE_PATH, f"categoria={categoria}")
+
+
+def _ruta_particion(categoria, mes, supermercado):
+    return os.path.join(_ruta_categoria(categoria), f"mes={mes}", f"supermercado={supermercado}", ARCHIVO_PARTICION)
+
+
+def categorias():
+    # Categorías que tienen datos en el almacén
+    return sorted(
+        os.path.basename(ruta).split("=", 1)[1]
+        for ruta in glob.glob(os.path.join(STORE_PATH, "categoria=*"))
+    )
+
+
+def _escribir_particion(ruta, df):
+    # Ordenado por producto y fecha para que las estadísticas de cada row group sirvan de filtro
+    tabla = pa.Table.from_pandas(df.sort_values(['producto', 'fecha']), schema=SCHEMA, preserve_index=False)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    # El prefijo "_" hace que el dataset ignore el temporal si queda a medio escribir
+    tmp_path = os.path.join(os.path.dirname(ruta), "_" + ARCHIVO_PARTICION + ".tmp")
+    pq.write_table(tabla, tmp_path, row_group_size=10_000)
+    os.replace(tmp_path, ruta)
+
+
+def agregar(df, categoria):
+    # Agrega registros (fecha, supermercado, producto, precio). Las fechas que llegan se reemplazan
+    # en todas las particiones de su mes, también las de supermercados que ya no tienen filas ese
+    # día: reprocesar un día no duplica filas ni deja precios viejos.
+    df = df[['fecha', 'supermercado', 'producto', 'precio']].copy()
+    df['fecha'] = pd.to_datetime(df['fecha']).dt.date
+    df['mes'] = pd.to_datetime(df['fecha']).dt.strftime('%Y-%m')
+
+    for mes, del_mes in df.groupby('mes'):
+        fechas = set(del_mes['fecha'])
+        nuevos_por_super = {supermercado: nuevos[['fecha', 'producto', 'precio']]
+                            for supermercado, nuevos in del_mes.groupby('supermercado')}
+        existentes_por_super = {
+            os.path.basename(os.path.dirname(ruta)).split("=", 1)[1]: ruta
+            for ruta in glob.glob(os.path.join(_ruta_categoria(categoria), f"mes={mes}", "supermercado=*", ARCHIVO_PARTICION))
+        }
+
+        for supermercado in sorted(set(nuevos_por_super) | set(existentes_por_super)):
+            ruta = _ruta_particion(categoria, mes, supermercado)
+            nuevos = nuevos_por_super.get(supermercado)
+            if supermercado in existentes_por_super:
+                existentes = pq.read_table(ruta).to_pandas()
+                quedan = existentes[~existentes['fecha'].isin(fechas)]
+                if nuevos is None and len(quedan) == len(existentes):
+                    continue  # el supermercado no tenía esas fechas: la partición no cambia
+                nuevos = quedan if nuevos is None else pd.concat([quedan, nuevos], ignore_index=True)
+            if nuevos.empty:
+                os.remove(ruta)  # solo tenía las fechas reemplazadas
+                continue
+            _escribir_particion(ruta, nuevos)
+
+
+def archivos(categoria):
+    # Archivos de partición actuales con su mtime y tamaño, para detectar cambios sin leerlos
+    firmas = {}
+    for ruta in glob.glob(os.path.join(_ruta_categoria(categoria), "mes=*", "supermercado=*", ARCHIVO_PARTICION)):
+        stat = os.stat(ruta)
+        firmas[ruta] = (stat.st_mtime_ns, stat.st_size)
+    return firmas
+
+
+def leer(categoria, desde=None, hasta=None, productos=None, supermercados=None):
+    # Lee el formato largo de una categoría aplicando los filtros en la lectura (particiones + estadísticas parquet)
+    if not os.path.isdir(_ruta_categoria(categoria)):
+        return pd.DataFrame(columns=['fecha', 'supermercado', 'producto', 'precio'])
+
+    dataset = ds.dataset(_ruta_categoria(categoria), format="parquet", partitioning=PARTICIONES)
+
+    filtro = None
+    condiciones = []
+    if desde is not None:
+        desde = pd.Timestamp(desde)
+        condiciones += [ds.field("mes") >= desde.strftime('%Y-%m'), ds.field("fecha") >= desde.date()]
+    if hasta is not None:
+        hasta = pd.Timestamp(hasta)
+        condiciones += [ds.field("mes") <= hasta.strftime('%Y-%m'), ds.field("fecha") <= hasta.date()]
+    if productos is not None:
+        condiciones.append(ds.field("producto").isin(list(productos)))
+    if supermercados is not None:
+        condiciones.append(ds.field("supermercado").isin(list(supermercados)))
+    for condicion in condiciones:
+        filtro = condicion if filtro is None else filtro & condicion
+
+    tabla = dataset.to_table(columns=['fecha', 'supermercado', 'producto', 'precio'], filter=filtro)
+    df = tabla.to_pandas()
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    return df.sort_values(['fecha', 'producto', 'supermercado'], ignore_index=True)
+
+
+def migrar_csv(categoria, cleaned_path=os.path.join("Data", "Prueba2")):
+    # Migración única: pasa los productos_unificados_*.csv (formato ancho) al almacén en formato largo
+    archivos = sorted(glob.glob(os.path.join(cleaned_path, categoria, "productos_unificados_*.csv")))
+    dfs = []
+    for fp in archivos:
+        df = pd.read_csv(fp)
+        super_cols = [col for col in df.columns if col not in ['fecha', 'producto']]
+        df_long = df.melt(id_vars=['fecha', 'producto'], value_vars=super_cols,
+                          var_name='supermercado', value_name='precio')
+        dfs.append(df_long.dropna(subset=['precio']))
+
+    if dfs:
+        agregar(pd.concat(dfs, ignore_index=True), categoria)
+    print(f"✅ {len(archivos)} archivos migrados a {_ruta_categoria(categoria)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Almacén Parquet de precios particionado por mes y supermercado.")
+    parser.add_argument("--categoria", choices=list(CATEGORIAS), default=CATEGORIA_DEFECTO)
+    parser.add_argument("--migrar", action="store_true", help="Migra los CSV de Data/Prueba2/<categoria> al almacén")
+    args = parser.parse_args()
+
+    if args.migrar:
+        migrar_csv(args.categoria)
+
+    df = leer(args.categoria)
+    print(f"📦 {len(df)} registros, {df['fecha'].nunique()} fechas, {df['producto'].nunique()} productos")
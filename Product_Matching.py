@@ -0,0 +1,226 @@
+import os
+import re
+import json
+import hashlib
+import unicodedata
+from collections import Counter, defaultdict
+
+# --- Motor de unificación de nombres ---
+# Normaliza el nombre (acentos, mayúsculas, unidades, marca), agrupa candidatos por
+# (marca, peso) y compara con similitud de tokens. Marcas, alias y palabras genéricas son de
+# cada categoría ("matching" en categorias.json). Solo se une a un canónico del mapa de
+# unificación, que además queda como override fijo: el resultado no depende del orden en que
+# llegan los nombres. Si dos canónicos quedan parejos el nombre no se une y queda para revisar.
+# Cada nombre crudo se decide una sola vez (caché en disco).
+
+VERSION = 2
+MATCHING_PATH = os.path.join("Data", "Matching")  # una caché por categoría
+UMBRAL = 0.6
+MARGEN = 0.1  # si el segundo candidato queda a menos de esto del mejor, se deja para revisar
+
+_PATRON_PESO = re.compile(
+    r"(?:(\d+(?:[.,]\d+)?)\s*)?(kg|kgs|kgm|kl|kilo|kilos|k|g|gr|grs|grm|gramos)\b"
+)
+
+
+def _sin_acentos(texto):
+    return "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+
+
+def reglas_categoria(matching):
+    # Marcas de la más larga a la más corta y genéricas como conjunto, una sola vez por motor
+    return {
+        "marcas": sorted(matching["marcas"], key=len, reverse=True),
+        "alias": matching["alias_marca"],
+        "genericas": set(matching["genericas"]),
+    }
+
+
+def normalizar(nombre, reglas):
+    # Devuelve (marca, peso en gramos, tokens distintivos)
+    texto = _sin_acentos(nombre).lower()
+    texto = re.sub(r"(\d)(kg|kgs|kgm|kl|g|gr|grs|grm)\b", r"\1 \2", texto)
+    texto = re.sub(r"\bx(kg|kgs|kl|k)\b", r"x \1", texto)
+    texto = re.sub(r"[^a-z0-9,. ]", " ", texto)
+
+    peso = None
+    match = _PATRON_PESO.search(texto)
+    if match:
+        cantidad = float(match.group(1).replace(",", ".")) if match.group(1) else 1.0
+        unidad = match.group(2)
+        peso = int(cantidad * 1000) if unidad.startswith("k") else int(cantidad)
+        texto = texto[:match.start()] + " " + texto[match.end():]
+
+    texto = re.sub(r"[^a-z0-9 ]", " ", texto)
+    texto = " " + re.sub(r"\s+", " ", texto).strip() + " "
+
+    marca = None
+    for candidata in reglas["marcas"]:
+        if f" {candidata} " in texto:
+            marca = reglas["alias"].get(candidata, candidata)
+            texto = texto.replace(f" {candidata} ", " ")
+            break
+    if marca is None:
+        for alias, marca_alias in reglas["alias"].items():
+            if f" {alias} " in texto:
+                marca = marca_alias
+                break
+
+    tokens = frozenset(t for t in texto.split() if t not in reglas["genericas"] and t not in (marca or "").split())
+    return marca, peso, tokens
+
+
+def similitud(a, b):
+    # Jaccard sobre tokens distintivos; dos nombres sin nada distintivo son iguales
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def version_motor(categoria):
+    contenido = json.dumps([VERSION, UMBRAL, MARGEN, categoria["matching"], categoria["unificacion"],
+                            sorted(categoria["excluir_productos"])], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(contenido.encode("utf-8")).hexdigest()
+
+
+def ruta_cache(categoria):
+    return os.path.join(MATCHING_PATH, f"{categoria}.json")
+
+
+def nuevo_motor(categoria, cache_path=None):
+    version = version_motor(categoria)
+    motor = {
+        "version": version,
+        "cache_path": cache_path,
+        "reglas": reglas_categoria(categoria["matching"]),
+        "fijos": {},                        # overrides manuales: variante -> canónico
+        "excluir": set(categoria["excluir_productos"]),
+        "decisiones": {},                   # nombre crudo -> {"canonico", "supermercado"[, "revisar"]}
+        "bloques": defaultdict(list),       # (marca, peso) -> [(tokens, canonico del mapa)]
+        "tiendas": defaultdict(set),        # canónico -> supermercados que ya lo usan
+    }
+
+    for canonical, variants in categoria["unificacion"].items():
+        motor["fijos"][canonical] = canonical
+        for variant in variants:
+            motor["fijos"][variant] = canonical
+        _registrar(motor, canonical)
+
+    # Decisiones previas (solo si el mapa/motor no cambió)
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("version") == version:
+            for nombre, decision in cache["decisiones"].items():
+                _aplicar(motor, nombre, decision["canonico"], decision["supermercado"], decision.get("revisar"))
+    return motor
+
+
+def _registrar(motor, canonico):
+    marca, peso, tokens = normalizar(canonico, motor["reglas"])
+    bloque = motor["bloques"][(marca, peso)]
+    if all(c != canonico for _, c in bloque):
+        bloque.append((tokens, canonico))
+
+
+def _aplicar(motor, nombre, canonico, supermercado, revisar=None):
+    motor["decisiones"][nombre] = {"canonico": canonico, "supermercado": supermercado}
+    if revisar:
+        motor["decisiones"][nombre]["revisar"] = revisar
+    motor["tiendas"][canonico].add(supermercado)
+
+
+def _proponer(motor, nombre, supermercado):
+    # (canónico, candidatos para revisar o None) de un nombre todavía sin decidir
+    if nombre in motor["fijos"]:
+        return motor["fijos"][nombre], None
+    if nombre in motor["excluir"]:
+        return nombre, None
+
+    marca, peso, tokens = normalizar(nombre, motor["reglas"])
+    # Sin marca solo se acepta una coincidencia exacta de tokens
+    umbral = UMBRAL if marca is not None else 1.0
+    candidatos = sorted(
+        (-similitud(tokens, tokens_cand), cand)
+        for tokens_cand, cand in motor["bloques"].get((marca, peso), [])
+        # Un canónico no puede juntar dos productos distintos del mismo supermercado
+        if supermercado not in motor["tiendas"][cand]
+    )
+    candidatos = [(-puntaje, cand) for puntaje, cand in candidatos if -puntaje >= umbral]
+    if len(candidatos) > 1 and candidatos[0][0] - candidatos[1][0] < MARGEN:
+        # Empate o casi: mejor un producto de más que una unión equivocada
+        return nombre, [cand for _, cand in candidatos]
+    if candidatos:
+        return candidatos[0][1], None
+    return nombre, None
+
+
+def canonico(motor, nombre, supermercado):
+    # Nombre canónico para un nombre crudo; se calcula una vez y queda en caché
+    decision = motor["decisiones"].get(nombre)
+    if decision is not None:
+        return decision["canonico"]
+
+    elegido, revisar = _proponer(motor, nombre, supermercado)
+    _aplicar(motor, nombre, elegido, supermercado, revisar)
+    return elegido
+
+
+def resolver(motor, pares):
+    # Decide una tanda de (nombre, supermercado) sin que importe el orden de llegada: primero los
+    # del mapa y después el resto, todos contra el mismo estado. Si dos nombres de una tienda caen
+    # en el mismo canónico no se une ninguno (quedan para revisar).
+    sueltos = {}
+    for nombre, supermercado in sorted(set(pares)):
+        if nombre in motor["decisiones"]:
+            continue
+        if nombre in motor["fijos"]:
+            canonico(motor, nombre, supermercado)
+        else:
+            sueltos.setdefault(nombre, supermercado)
+
+    propuestas = {nombre: _proponer(motor, nombre, supermercado) for nombre, supermercado in sueltos.items()}
+    destinos = Counter((sueltos[nombre], elegido) for nombre, (elegido, _) in propuestas.items() if elegido != nombre)
+    for nombre, (elegido, revisar) in propuestas.items():
+        if elegido != nombre and destinos[(sueltos[nombre], elegido)] > 1:
+            elegido, revisar = nombre, [elegido]
+        _aplicar(motor, nombre, elegido, sueltos[nombre], revisar)
+
+
+def guardar(motor):
+    if not motor["cache_path"]:
+        return
+    os.makedirs(os.path.dirname(motor["cache_path"]), exist_ok=True)
+    tmp_path = motor["cache_path"] + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": motor["version"], "decisiones": motor["decisiones"]}, f,
+                  ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, motor["cache_path"])
+
+
+if __name__ == "__main__":
+    import argparse
+    import Raw_Store
+    from Categorias import CATEGORIAS, CATEGORIA_DEFECTO
+
+    parser = argparse.ArgumentParser(description="Muestra las uniones automáticas que propone el motor para una categoría.")
+    parser.add_argument("--categoria", choices=list(CATEGORIAS), default=CATEGORIA_DEFECTO)
+    args = parser.parse_args()
+    categoria = CATEGORIAS[args.categoria]
+
+    motor = nuevo_motor(categoria, cache_path=None)
+    carpeta = Raw_Store.directorio(args.categoria)
+    pares = []
+    for filename in sorted(os.listdir(carpeta)):
+        datos = Raw_Store.partes(filename)
+        if datos:
+            pares.extend((nombre, datos[0]) for nombre in Raw_Store.leer(os.path.join(carpeta, filename))['nombre'].unique())
+    resolver(motor, pares)
+
+    for nombre, decision in sorted(motor["decisiones"].items()):
+        if decision["canonico"] != nombre and nombre not in motor["fijos"]:
+            print(f"🔗 [{decision['supermercado']}] {nombre}  →  {decision['canonico']}")
+    # Lo que queda para revisar se resuelve agregando la variante al mapa de unificación
+    for nombre, decision in sorted(motor["decisiones"].items()):
+        if decision.get("revisar"):
+            print(f"❓ [{decision['supermercado']}] {nombre}  →  {' | '.join(decision['revisar'])}")
@@ -0,0 +1,200 @@
+import os
+import re
+import json
+import math
+import hashlib
+from datetime import datetime
+
+import pandas as pd
+
+# --- Almacén de crudos: una foto completa cada tanto y, entre medio, solo los cambios ---
+# Data/Raw/<categoria>/<tienda>_raw_<fecha>.csv    foto completa del día
+# Data/Raw/<categoria>/<tienda>_delta_<fecha>.csv  altas, bajas y cambios contra la vista anterior
+# Data/Raw/<categoria>/<tienda>_huellas.json       páginas de la última corrida ya procesadas, por hash
+# La vista completa de un día = última foto + los deltas que la siguen, en orden.
+# Varias corridas del mismo día van al mismo archivo, marcadas con la columna "corrida": en una
+# foto cada corrida es una foto completa (vale la última) y en un delta cada corrida es el delta
+# contra la vista que dejó la anterior, así que reaplicar todas las filas en orden da la vista final.
+# Una corrida cortada por una página que agotó los reintentos se guarda como "<corrida> parcial":
+# sus productos se agregan o actualizan, pero nunca quitan los que faltan (no hay bajas).
+RAW_DATA_PATH = os.path.join("Data", "Raw")
+COLUMNAS_RAW = ["fecha", "nombre", "precio", "producto", "corrida"]
+COLUMNAS_DELTA = COLUMNAS_RAW + ["cambio"]
+DIAS_COMPLETO = 7  # como mucho una semana de deltas entre dos fotos completas
+PARCIAL = " parcial"  # sufijo de la columna "corrida" en las corridas cortadas
+
+PATRON_ARCHIVO = re.compile(r'(\w+?)_(raw|delta)_(\d{4}-\d{2}-\d{2})\.csv$')
+
+
+def directorio(clave):
+    return os.path.join(RAW_DATA_PATH, clave)
+
+
+def ruta(tienda, clave, fecha=None, tipo="raw"):
+    fecha = fecha or datetime.now().strftime('%Y-%m-%d')
+    return os.path.join(directorio(clave), f"{tienda}_{tipo}_{fecha}.csv")
+
+
+def partes(filename):
+    # (tienda, tipo, fecha) o None si no es un archivo crudo
+    match = PATRON_ARCHIVO.match(filename)
+    return match.groups() if match else None
+
+
+def archivos(carpeta, tienda):
+    # [(fecha, tipo, archivo)] de la tienda, en orden de fecha
+    encontrados = []
+    if os.path.isdir(carpeta):
+        for filename in os.listdir(carpeta):
+            datos = partes(filename)
+            if datos and datos[0] == tienda:
+                encontrados.append((datos[2], datos[1], filename))
+    return sorted(encontrados)
+
+
+def cadena(carpeta, tienda, fecha):
+    # Archivos que hacen falta para la vista de `fecha`: la última foto y los deltas posteriores
+    previos = [a for a in archivos(carpeta, tienda) if a[0] <= fecha]
+    fotos = [i for i, (_, tipo, _) in enumerate(previos) if tipo == "raw"]
+    if not fotos:
+        return []
+    return [filename for _, _, filename in previos[fotos[-1]:]]
+
+
+def dependencias(carpeta, filename):
+    # Un delta depende de toda su cadena: si cambia un archivo anterior cambia la vista del día
+    tienda, tipo, fecha = partes(filename)
+    return [filename] if tipo == "raw" else cadena(carpeta, tienda, fecha)
+
+
+def leer_foto(filepath):
+    # Una foto con varias corridas del día vale por la última completa, más lo que agregaron o
+    # cambiaron las parciales que la siguen (los crudos viejos no tienen la columna)
+    df = pd.read_csv(filepath)
+    if "corrida" in df.columns and not df.empty:
+        corridas = df["corrida"].fillna("").astype(str)
+        parciales = corridas.str.endswith(PARCIAL)
+        completas = corridas[~parciales]
+        inicio = int((corridas == completas.iloc[-1]).to_numpy().argmax()) if len(completas) else 0
+        df = df.iloc[inicio:]
+        if parciales.iloc[inicio:].any():
+            df = df.drop_duplicates("nombre", keep="last")
+        df = df.reset_index(drop=True)
+    return df
+
+
+def leer_vista(carpeta, tienda, fecha):
+    # Vista completa del día reconstruida (mismas columnas que una foto); None si no hay foto base
+    filenames = cadena(carpeta, tienda, fecha)
+    if not filenames:
+        return None
+
+    vista = {}
+    for filename in filenames:
+        if partes(filename)[1] == "raw":
+            df = leer_foto(os.path.join(carpeta, filename))
+            vista = {}
+            for registro in df.to_dict("records"):
+                vista.setdefault(registro["nombre"], registro)
+        else:
+            # Un cambio reemplaza en su lugar, un alta va al final y una baja se quita
+            df = pd.read_csv(os.path.join(carpeta, filename))
+            for registro in df.to_dict("records"):
+                cambio = registro.pop("cambio")
+                if cambio == "baja":
+                    vista.pop(registro["nombre"], None)
+                else:
+                    vista[registro["nombre"]] = registro
+
+    df = pd.DataFrame(list(vista.values()))
+    if df.empty:
+        df = pd.DataFrame(columns=COLUMNAS_RAW)
+    df["fecha"] = fecha
+    return df
+
+
+def leer(filepath):
+    # Lee un archivo crudo como vista completa del día, sea foto o delta
+    carpeta, filename = os.path.split(filepath)
+    tienda, tipo, fecha = partes(filename)
+    if tipo == "raw":
+        return leer_foto(filepath)
+    return leer_vista(carpeta, tienda, fecha)
+
+
+def tipo_del_dia(clave, tienda, fecha):
+    # "raw" o "delta" si la tienda ya tiene crudo de `fecha` (una corrida anterior del día), si no None
+    for f, tipo, _ in archivos(directorio(clave), tienda):
+        if f == fecha:
+            return tipo
+    return None
+
+
+def vista(clave, tienda, fecha):
+    # Vista de `fecha` como {nombre: registro}, o None si no hay foto base
+    df = leer_vista(directorio(clave), tienda, fecha)
+    if df is None:
+        return None
+    return {registro["nombre"]: registro for registro in df.to_dict("records")}
+
+
+def anterior(clave, tienda, fecha):
+    # Vista más reciente antes de `fecha`, o None si no hay
+    fechas = [f for f, _, _ in archivos(directorio(clave), tienda) if f < fecha]
+    if not fechas:
+        return None
+    return vista(clave, tienda, fechas[-1])
+
+
+def necesita_foto(clave, tienda, fecha):
+    # Foto completa si no hay ninguna previa o la última tiene DIAS_COMPLETO días o más
+    fotos = [f for f, tipo, _ in archivos(directorio(clave), tienda) if tipo == "raw" and f < fecha]
+    if not fotos:
+        return True
+    dias = (datetime.strptime(fecha, '%Y-%m-%d') - datetime.strptime(fotos[-1], '%Y-%m-%d')).days
+    return dias >= DIAS_COMPLETO
+
+
+def descartar(tienda, clave, fecha, tipo):
+    # Al rehacer un día queda un solo archivo por tienda y fecha (foto o delta)
+    if os.path.exists(ruta(tienda, clave, fecha, tipo)):
+        os.remove(ruta(tienda, clave, fecha, tipo))
+
+
+def _igual(a, b):
+    vacio_a = a is None or (isinstance(a, float) and math.isnan(a))
+    vacio_b = b is None or (isinstance(b, float) and math.isnan(b))
+    return (vacio_a and vacio_b) or a == b
+
+
+def mismo_registro(previo, registro):
+    return _igual(previo.get("precio"), registro.get("precio")) and _igual(previo.get("producto"), registro.get("producto"))
+
+
+# --- Huellas de página ---
+def huella(lote):
+    # Hash del bloque de productos tal como se extrajo (sin la fecha)
+    contenido = json.dumps([(r["nombre"], r["precio"]) for r in lote], ensure_ascii=False)
+    return hashlib.sha1(contenido.encode("utf-8")).hexdigest()
+
+
+def ruta_huellas(tienda, clave):
+    return os.path.join(directorio(clave), f"{tienda}_huellas.json")
+
+
+def cargar_huellas(tienda, clave):
+    if not os.path.exists(ruta_huellas(tienda, clave)):
+        return {}
+    try:
+        with open(ruta_huellas(tienda, clave), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def guardar_huellas(tienda, clave, huellas):
+    os.makedirs(directorio(clave), exist_ok=True)
+    tmp_path = ruta_huellas(tienda, clave) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(huellas, f, ensure_ascii=False)
+    os.replace(tmp_path, ruta_huellas(tienda, clave))
@@ -0,0 +1,195 @@
+import asyncio
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from playwright.async_api import async_playwright
+
+import Scraping_Utils
+import Metricas
+import Names_Unification
+from Categorias import CATEGORIAS
+from Scraping_Utils import CHROMIUM_ARGS
+from Run_Scrapers import SCRAPERS, MAX_CONCURRENCIA, correr_tienda
+
+# --- Recolector: servicio que corre siempre ---
+# Un solo Chromium caliente compartido por todas las tiendas (cada corrida abre su contexto),
+# cada tienda con su propia cadencia con azar, y la unificación de las categorías apenas llegan
+# sus CSV crudos. Expone /salud y /estado en JSON.
+
+# Cada cuántos segundos se vuelve a scrapear cada tienda (±JITTER)
+CADENCIAS = {
+    "anonima": 6 * 3600,
+    "carrefour": 4 * 3600,
+    "coope": 8 * 3600,
+    "coto": 8 * 3600,
+    "jumbo": 4 * 3600,
+}
+JITTER = 0.15
+ESPERA_FALLA = 15 * 60      # tras una corrida fallida se reintenta antes que la cadencia normal
+ARRANQUE_ESCALONADO = 60    # las primeras corridas se reparten en este rango de segundos
+
+HOST = "127.0.0.1"
+PUERTO = 8765
+
+
+def nuevo_estado(tiendas):
+    return {
+        "inicio": datetime.now().isoformat(timespec="seconds"),
+        "navegador": {"conectado": False, "lanzamientos": 0},
+        "tiendas": {
+            tienda: {"corridas": 0, "fallas_seguidas": 0, "ultima": None, "proxima": None}
+            for tienda in tiendas
+        },
+        "unificacion": {"corridas": 0, "ultima": None},
+    }
+
+
+def proxima_espera(tienda, fallo):
+    base = min(CADENCIAS[tienda], ESPERA_FALLA) if fallo else CADENCIAS[tienda]
+    return base * random.uniform(1 - JITTER, 1 + JITTER)
+
+
+async def navegador_activo(recolector):
+    # Relanza Chromium si se cayó; el lock evita que dos tiendas lo relancen a la vez
+    async with recolector["lock_navegador"]:
+        browser = recolector["browser"]
+        if browser is None or not browser.is_connected():
+            browser = await recolector["playwright"].chromium.launch(headless=True, args=CHROMIUM_ARGS)
+            estado_navegador = recolector["estado"]["navegador"]
+            browser.on("disconnected", lambda _: estado_navegador.update(conectado=False))
+            recolector["browser"] = browser
+            recolector["estado"]["navegador"]["lanzamientos"] += 1
+            print("🌐 Chromium lanzado")
+        recolector["estado"]["navegador"]["conectado"] = True
+        return browser
+
+
+async def unificar(recolector, claves):
+    # Incremental (manifest): solo se reprocesan las fechas cuyos crudos cambiaron.
+    # De a una unificación por vez y en un hilo, para no frenar a los scrapers.
+    estado = recolector["estado"]["unificacion"]
+    async with recolector["lock_unificacion"]:
+        inicio = time.perf_counter()
+        try:
+            await asyncio.to_thread(Names_Unification.unificar, categorias=claves, procesos=1)
+            error = None
+        except Exception as e:
+            error = e
+            print(f"❌ Unificación de {', '.join(claves)} falló: {e}")
+        estado["corridas"] += 1
+        estado["ultima"] = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "categorias": claves,
+            "duracion": round(time.perf_counter() - inicio, 2),
+            "error": str(error) if error else None,
+        }
+
+
+async def ciclo_tienda(recolector, tienda, categorias):
+    estado = recolector["estado"]["tiendas"][tienda]
+    await asyncio.sleep(random.uniform(0, ARRANQUE_ESCALONADO))
+    while True:
+        Scraping_Utils.limpiar_journals()
+        browser = await navegador_activo(recolector)
+        reporte = await correr_tienda(tienda, SCRAPERS[tienda], browser, recolector["semaforo"], categorias)
+        if not browser.is_connected() and (reporte["error"] is not None or not any(reporte["resultados"].values())):
+            # Chromium se cayó antes o durante la corrida: se relanza y la tienda se reintenta una vez
+            print(f"🌐 {tienda}: el navegador se desconectó, se relanza y se reintenta")
+            browser = await navegador_activo(recolector)
+            reporte = await correr_tienda(tienda, SCRAPERS[tienda], browser, recolector["semaforo"], categorias)
+
+        fallo = reporte["error"] is not None or not any(reporte["resultados"].values())
+        estado["corridas"] += 1
+        estado["fallas_seguidas"] = estado["fallas_seguidas"] + 1 if fallo else 0
+        estado["ultima"] = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "duracion": round(reporte["duracion"], 2),
+            "productos": reporte["resultados"],
+            "error": str(reporte["error"]) if reporte["error"] else None,
+        }
+
+        # Las categorías que trajeron datos se unifican ya, sin esperar al resto de las tiendas
+        claves = [clave for clave, cantidad in reporte["resultados"].items() if cantidad]
+        if claves:
+            await unificar(recolector, claves)
+        Metricas.volcar()
+
+        espera = proxima_espera(tienda, fallo)
+        estado["proxima"] = (datetime.now() + timedelta(seconds=espera)).isoformat(timespec="seconds")
+        print(f"🕒 {tienda}: próxima corrida a las {estado['proxima']}")
+        await asyncio.sleep(espera)
+
+
+# --- /salud y /estado (HTTP mínimo sobre asyncio, sin dependencias) ---
+async def atender(recolector, reader, writer):
+    try:
+        linea = (await reader.readline()).decode("latin-1").split()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass  # se descartan los headers
+        ruta = linea[1] if len(linea) > 1 else "/"
+
+        estado = recolector["estado"]
+        browser = recolector["browser"]
+        estado["navegador"]["conectado"] = browser is not None and browser.is_connected()
+        if ruta == "/salud":
+            sano = estado["navegador"]["conectado"]
+            codigo, motivo, cuerpo = (200, "OK", {"ok": True}) if sano else (503, "Service Unavailable", {"ok": False})
+        elif ruta == "/estado":
+            codigo, motivo, cuerpo = 200, "OK", estado
+        else:
+            codigo, motivo, cuerpo = 404, "Not Found", {"error": "rutas disponibles: /salud, /estado"}
+
+        datos = json.dumps(cuerpo, ensure_ascii=False, indent=1).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {codigo} {motivo}\r\nContent-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(datos)}\r\nConnection: close\r\n\r\n".encode("latin-1") + datos
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def recolectar(tiendas=None, categorias=None, concurrencia=MAX_CONCURRENCIA, host=HOST, puerto=PUERTO):
+    tiendas = tiendas or list(SCRAPERS)
+    # Cada corrida es un refresco completo: el journal del día no se reutiliza entre corridas
+    Scraping_Utils.REANUDAR = False
+
+    async with async_playwright() as playwright:
+        recolector = {
+            "playwright": playwright,
+            "browser": None,
+            "estado": nuevo_estado(tiendas),
+            "semaforo": asyncio.Semaphore(concurrencia),
+            "lock_navegador": asyncio.Lock(),
+            "lock_unificacion": asyncio.Lock(),
+        }
+        await navegador_activo(recolector)
+
+        servidor = await asyncio.start_server(lambda r, w: atender(recolector, r, w), host, puerto)
+        print(f"🩺 Estado en http://{host}:{puerto}/estado")
+
+        try:
+            async with servidor:
+                await asyncio.gather(*[ciclo_tienda(recolector, tienda, categorias) for tienda in tiendas])
+        finally:
+            if recolector["browser"] is not None and recolector["browser"].is_connected():
+                await recolector["browser"].close()
+            Metricas.volcar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recolector continuo: scrapea cada tienda con su cadencia y unifica al llegar los datos.")
+    parser.add_argument("--tiendas", nargs="+", choices=list(SCRAPERS), help="Tiendas a scrapear (por defecto, todas)")
+    parser.add_argument("--categorias", nargs="+", choices=list(CATEGORIAS), help="Categorías a scrapear (por defecto, todas)")
+    parser.add_argument("--concurrencia", type=int, default=MAX_CONCURRENCIA, help="Máximo de tiendas corriendo a la vez")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(recolectar(args.tiendas, args.categorias, args.concurrencia, args.host, args.puerto))
+    except KeyboardInterrupt:
+        print("👋 Recolector detenido")
@@ -0,0 +1,109 @@
+import asyncio
+import argparse
+import time
+
+import Scraping_Utils
+import Metricas
+from Categorias import CATEGORIAS
+from Scraping_Utils import navegador, reporte_red, CHROMIUM_ARGS
+from Anónima import scrape_anonima
+from Carrefour import scrape_carrefour
+from Coope import scrape_coope
+from Coto import scrape_coto
+from Jumbo import scrape_jumbo
+
+# --- Scrapers disponibles (nombre de tienda -> función que devuelve {categoría: cantidad}) ---
+# Cada scraper escribe sus CSV crudos a medida que avanza (ver Pipeline)
+SCRAPERS = {
+    "anonima": scrape_anonima,
+    "carrefour": scrape_carrefour,
+    "coope": scrape_coope,
+    "coto": scrape_coto,
+    "jumbo": scrape_jumbo,
+}
+
+MAX_CONCURRENCIA = 3
+
+# Pestañas en paralelo por tienda (solo las que paginan por URL)
+PAGINAS_PARALELAS = {
+    "carrefour": 3,
+    "anonima": 2,
+    "jumbo": 2,
+}
+
+
+async def correr_tienda(tienda, scraper, browser, semaforo, categorias=None):
+    async with semaforo:
+        print(f"🚀 Iniciando {tienda}...")
+        inicio = time.perf_counter()
+        try:
+            kwargs = {}
+            if tienda in PAGINAS_PARALELAS:
+                kwargs["paginas_paralelas"] = PAGINAS_PARALELAS[tienda]
+            resultados = await scraper(browser=browser, categorias=categorias, **kwargs)
+            error = None
+        except Exception as e:
+            # Un error en una tienda no frena al resto
+            resultados = {}
+            error = e
+        duracion = time.perf_counter() - inicio
+    Metricas.registrar("scraper", "tienda", duracion, tienda=tienda, error=str(error) if error else None)
+
+    if error:
+        print(f"❌ {tienda} falló en {duracion:.1f}s: {error}")
+    else:
+        detalle = ", ".join(f"{categoria} {cantidad}" for categoria, cantidad in resultados.items())
+        print(f"✅ {tienda}: {detalle} productos en {duracion:.1f}s")
+
+    return {"tienda": tienda, "resultados": resultados, "duracion": duracion, "error": error}
+
+
+async def correr_scrapers(tiendas=None, concurrencia=MAX_CONCURRENCIA, categorias=None):
+    tiendas = tiendas or list(SCRAPERS)
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    inicio = time.perf_counter()
+    async with navegador(args=CHROMIUM_ARGS) as browser:
+        reportes = await asyncio.gather(*[
+            correr_tienda(tienda, SCRAPERS[tienda], browser, semaforo, categorias)
+            for tienda in tiendas
+        ])
+    total = time.perf_counter() - inicio
+    Metricas.registrar("scraper", "corrida", total)
+
+    return reportes, total
+
+
+def imprimir_reporte(reportes, total):
+    print("\n📊 Resumen de la corrida")
+    for r in sorted(reportes, key=lambda r: r["duracion"], reverse=True):
+        total_productos = sum(r["resultados"].values())
+        estado = f"ERROR: {r['error']}" if r["error"] else f"{total_productos} productos en {len(r['resultados'])} categorías"
+        print(f"  {r['tienda']:<10} {r['duracion']:>7.1f}s  {estado}")
+    suma = sum(r["duracion"] for r in reportes)
+    print(f"⏱️ Tiempo total: {total:.1f}s (secuencial hubiera sido ~{suma:.1f}s)")
+    print("\n🌐 Tráfico de red")
+    print(reporte_red())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Corre todos los scrapers en paralelo sobre un único Chromium.")
+    parser.add_argument("--tiendas", nargs="+", choices=list(SCRAPERS), help="Tiendas a scrapear (por defecto, todas)")
+    parser.add_argument("--categorias", nargs="+", choices=list(CATEGORIAS), help="Categorías a scrapear (por defecto, todas)")
+    parser.add_argument("--concurrencia", type=int, default=MAX_CONCURRENCIA, help="Máximo de tiendas corriendo a la vez")
+    parser.add_argument("--sin-bloqueo", action="store_true", help="No bloquear imágenes, fuentes ni analítica")
+    parser.add_argument("--sin-reanudar", action="store_true", help="Ignorar el journal del día y scrapear todas las páginas de nuevo")
+    args = parser.parse_args()
+
+    if args.sin_bloqueo:
+        Scraping_Utils.BLOQUEAR_RECURSOS = False
+    if args.sin_reanudar:
+        Scraping_Utils.REANUDAR = False
+
+    # Los journals de días anteriores ya no sirven para reanudar
+    Scraping_Utils.limpiar_journals()
+
+    # Un CSV por tienda y categoría (Data/Raw/<categoria>/), escrito mientras se scrapea
+    reportes, total = asyncio.run(correr_scrapers(args.tiendas, args.concurrencia, args.categorias))
+
+    imprimir_reporte(reportes, total)
@@ -0,0 +1,384 @@
+import asyncio
+import os
+import json
+import time
+import random
+import shutil
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+
+from playwright.async_api import async_playwright
+
+import Pipeline
+import Metricas
+
+# Tiempo máximo (segundos) que cada tienda espera a que la grilla de productos esté lista
+PRESUPUESTO_ESPERA = {
+    "anonima": 8,
+    "carrefour": 12,
+    "coope": 10,
+    "coto": 10,
+    "jumbo": 6,
+}
+
+# Argumentos de lanzamiento que usan los scrapers (unión de todos, así el navegador compartido sirve para cualquiera)
+CHROMIUM_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+]
+
+# --- Bloqueo de recursos ---
+# Activo por defecto: para leer nombre y precio no hace falta bajar imágenes, fuentes ni analítica
+BLOQUEAR_RECURSOS = True
+TIPOS_BLOQUEADOS = {"image", "media", "font"}
+DOMINIOS_BLOQUEADOS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googleadservices.com",
+    "facebook.net",
+    "facebook.com/tr",
+    "hotjar.com",
+    "clarity.ms",
+    "nr-data.net",
+    "newrelic.com",
+    "criteo.com",
+    "criteo.net",
+    "tiktok.com",
+    "segment.io",
+    "bat.bing.com",
+    "insider.com",
+    "useinsider.com",
+]
+
+# Fragmentos de URL que nunca se bloquean por tienda (lo que la página necesite para mostrar precios)
+PERMITIDOS = {
+    "anonima": [],
+    "carrefour": [],
+    "coope": [],
+    "coto": [],
+    "jumbo": [],
+}
+
+# Tamaño promedio estimado (bytes) de cada tipo bloqueado, para estimar lo que se ahorró
+TAMAÑO_ESTIMADO = {"image": 40_000, "media": 500_000, "font": 30_000, "script": 60_000}
+
+# Estadísticas de red por tienda para la corrida actual
+ESTADISTICAS_RED = defaultdict(Counter)
+
+# --- Fixtures: grabar las páginas visitadas (HAR) o servirlas desde disco sin red ---
+FIXTURES_PATH = os.path.join("Data", "Fixtures")
+MODO_FIXTURES = None  # None, "grabar" o "reproducir"
+
+# Categorías que una tienda scrapea a la vez dentro del mismo contexto
+CATEGORIAS_PARALELAS = 2
+
+# --- Journal por página: lo ya scrapeado en el día se reentrega sin volver a navegar ---
+# Data/Journal/<fecha>/<tienda>_<categoria>.jsonl, una línea por página o paso de "Siguiente".
+# Se borra cuando la corrida queda guardada completa: solo se reanudan corridas sin terminar.
+JOURNAL_PATH = os.path.join("Data", "Journal")
+REANUDAR = True  # False: se ignora el journal del día y se scrapea todo de nuevo
+
+# Reintentos por página con espera exponencial acotada (1s, 2s, 4s... hasta ESPERA_MAXIMA)
+REINTENTOS = 3
+ESPERA_BASE = 1.0
+ESPERA_MAXIMA = 8.0
+
+# Segundos y cantidad de pasos por tienda y etapa (navegacion, espera, extraccion)
+TIEMPOS = defaultdict(Counter)
+CONTEOS = defaultdict(Counter)
+
+
+@asynccontextmanager
+async def navegador(browser=None, args=None):
+    # Si ya nos pasan un navegador (orquestador) lo reutilizamos y no lo cerramos
+    if browser is not None:
+        yield browser
+        return
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True, args=args or [])
+        try:
+            yield browser
+        finally:
+            await browser.close()
+
+
+async def nuevo_contexto(browser, tienda, bloquear=None, **kwargs):
+    # Crea el contexto de la tienda con el filtro de recursos instalado (salvo bloquear=False)
+    if bloquear is None:
+        bloquear = BLOQUEAR_RECURSOS
+
+    ruta_har = os.path.join(FIXTURES_PATH, f"{tienda}.har.zip")
+    if MODO_FIXTURES == "grabar":
+        os.makedirs(FIXTURES_PATH, exist_ok=True)
+        kwargs["record_har_path"] = ruta_har  # se escribe al cerrar el contexto
+
+    context = await browser.new_context(**kwargs)
+    if MODO_FIXTURES == "reproducir":
+        # Todo lo que no esté grabado se aborta: la corrida queda 100% offline
+        await context.route_from_har(ruta_har, not_found="abort")
+
+    estadisticas = ESTADISTICAS_RED[tienda]
+    permitidos = PERMITIDOS.get(tienda, [])
+
+    async def filtrar(route):
+        request = route.request
+        url = request.url
+        if not any(p in url for p in permitidos):
+            tipo = request.resource_type
+            if tipo in TIPOS_BLOQUEADOS or any(d in url for d in DOMINIOS_BLOQUEADOS):
+                estadisticas["bloqueados"] += 1
+                estadisticas["bytes_ahorrados"] += TAMAÑO_ESTIMADO.get(tipo, TAMAÑO_ESTIMADO["script"])
+                await route.abort()
+                return
+        # fallback: sigue a la red o al HAR si se está reproduciendo
+        await route.fallback()
+
+    def contar_respuesta(response):
+        estadisticas["requests"] += 1
+        estadisticas["bytes_descargados"] += int(response.headers.get("content-length", 0) or 0)
+
+    if bloquear:
+        await context.route("**/*", filtrar)
+    context.on("response", contar_respuesta)
+    return context
+
+
+@contextmanager
+def cronometro(tienda, etapa, categoria=None, pagina=None):
+    # Acumula el tiempo de una etapa (navegacion, espera, scroll, extraccion) para la tienda
+    # y deja la medición de la página en Metricas
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion = time.perf_counter() - inicio
+        TIEMPOS[tienda][etapa] += duracion
+        CONTEOS[tienda][etapa] += 1
+        Metricas.registrar("scraper", etapa, duracion, tienda=tienda, categoria=categoria, pagina=pagina)
+
+
+def reporte_red():
+    # Resumen por tienda de requests/bytes descargados y bloqueados
+    lineas = []
+    for tienda, e in sorted(ESTADISTICAS_RED.items()):
+        lineas.append(
+            f"  {tienda:<10} {e['requests']:>5} requests, {e['bytes_descargados'] / 1e6:>6.2f} MB descargados · "
+            f"{e['bloqueados']:>5} bloqueados, ~{e['bytes_ahorrados'] / 1e6:.2f} MB ahorrados"
+        )
+    return "\n".join(lineas)
+
+
+def abrir_journal(tienda, clave):
+    # Devuelve {"ruta", "pasos": {paso: (registros, seguir)}} con lo que ya se scrapeó hoy
+    ruta = os.path.join(JOURNAL_PATH, datetime.now().strftime('%Y-%m-%d'), f"{tienda}_{clave}.jsonl")
+    pasos = {}
+    if REANUDAR and os.path.exists(ruta):
+        with open(ruta, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    entrada = json.loads(linea)
+                except json.JSONDecodeError:
+                    break  # última línea cortada por una caída: se rehace esa página
+                pasos[entrada["paso"]] = (entrada["registros"], entrada["seguir"])
+    elif os.path.exists(ruta):
+        os.remove(ruta)
+    if pasos:
+        print(f"📒 {tienda}/{clave}: se reanuda con {len(pasos)} páginas ya scrapeadas hoy")
+    return {"ruta": ruta, "pasos": pasos}
+
+
+def anotar_journal(journal, paso, registros, seguir):
+    if journal is None:
+        return
+    journal["pasos"][paso] = (registros, seguir)
+    os.makedirs(os.path.dirname(journal["ruta"]), exist_ok=True)
+    with open(journal["ruta"], "a", encoding="utf-8") as f:
+        f.write(json.dumps({"paso": paso, "registros": registros, "seguir": seguir}, ensure_ascii=False) + "\n")
+
+
+def cerrar_journal(journal):
+    # La corrida ya está en el crudo del día: una segunda corrida vuelve a scrapear todo
+    if journal is not None and os.path.exists(journal["ruta"]):
+        os.remove(journal["ruta"])
+
+
+def limpiar_journals():
+    # Los journals solo sirven para reanudar el mismo día
+    hoy = datetime.now().strftime('%Y-%m-%d')
+    if os.path.isdir(JOURNAL_PATH):
+        for fecha in os.listdir(JOURNAL_PATH):
+            if fecha < hoy:
+                shutil.rmtree(os.path.join(JOURNAL_PATH, fecha), ignore_errors=True)
+
+
+async def con_reintentos(funcion, etiqueta, intentos=None):
+    # funcion(intento) se reintenta con espera exponencial acotada y algo de azar; si se
+    # agotan los intentos se propaga el último error
+    intentos = intentos or REINTENTOS
+    for intento in range(1, intentos + 1):
+        try:
+            return await funcion(intento)
+        except Exception as e:
+            if intento == intentos:
+                raise
+            espera = min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** (intento - 1)) * random.uniform(0.5, 1.0)
+            print(f"🔁 [{etiqueta}] intento {intento}/{intentos} falló ({e}), reintento en {espera:.1f}s")
+            await asyncio.sleep(espera)
+
+
+async def recorrer_paginas(context, numeros, procesar_pagina, paralelo=1, journal=None, etiqueta=""):
+    # Reparte páginas direccionables por URL entre `paralelo` pestañas del mismo contexto.
+    # procesar_pagina(page, numero) devuelve (registros, seguir); es un generador que entrega
+    # los registros de cada página en orden y corta en la primera página que pida detenerse.
+    # Cada página se reintenta por separado y queda anotada en el journal; las que ya estaban
+    # anotadas se entregan sin navegar.
+    paralelo = max(1, paralelo)
+    pestañas = [await context.new_page() for _ in range(paralelo)]
+    numeros = list(numeros)
+
+    async def pagina(pestaña, numero):
+        if journal is not None and numero in journal["pasos"]:
+            return journal["pasos"][numero]
+        registros, seguir = await con_reintentos(lambda intento: procesar_pagina(pestaña, numero), f"{etiqueta} p{numero}")
+        anotar_journal(journal, numero, registros, seguir)
+        return registros, seguir
+
+    try:
+        for inicio in range(0, len(numeros), paralelo):
+            lote = numeros[inicio:inicio + paralelo]
+            # Se espera a todo el lote aunque una página falle: sus hermanas terminan antes de cerrar
+            # las pestañas y las que quedaron antes del error se entregan igual
+            salidas = await asyncio.gather(*[
+                pagina(pestaña, numero) for pestaña, numero in zip(pestañas, lote)
+            ], return_exceptions=True)
+            for salida in salidas:
+                if isinstance(salida, BaseException):
+                    raise salida
+                registros, seguir = salida
+                if registros:
+                    yield registros
+                if not seguir:
+                    return
+    finally:
+        # El contexto sigue vivo para otras categorías: se cierran solo estas pestañas
+        for pestaña in pestañas:
+            await pestaña.close()
+
+
+async def por_categoria(tienda, seleccion, scrape_categoria, guardar=True, paralelo=None):
+    # scrape_categoria(categoria, busqueda, journal) es un generador de tandas crudas (una por
+    # página) que se conecta al Pipeline; corre cada par de `seleccion` sobre el mismo contexto
+    # (cookies y sesión compartidas), hasta `paralelo` categorías a la vez.
+    # Devuelve {clave de categoría: productos}; un error en una categoría no frena al resto.
+    # Sin guardar (benchmark) tampoco se usa el journal.
+    semaforo = asyncio.Semaphore(paralelo or CATEGORIAS_PARALELAS)
+
+    async def correr(categoria, busqueda):
+        async with semaforo:
+            journal = abrir_journal(tienda, categoria["clave"]) if guardar else None
+            try:
+                cantidad = await Pipeline.procesar(scrape_categoria(categoria, busqueda, journal), tienda, categoria, guardar)
+                cerrar_journal(journal)
+                return cantidad
+            except Exception as e:
+                # Las páginas terminadas quedaron en el CSV y en el journal: la próxima corrida sigue desde ahí
+                print(f"❌ {tienda}/{categoria['clave']} falló: {e}")
+                return 0
+
+    salidas = await asyncio.gather(*[correr(categoria, busqueda) for categoria, busqueda in seleccion])
+    return {categoria["clave"]: cantidad for (categoria, _), cantidad in zip(seleccion, salidas)}
+
+
+# Espera en el navegador (una sola ida y vuelta) hasta que haya elementos del selector,
+# el primero haya cambiado respecto de `previo` (si se pasa) y el DOM lleve `quietud` ms sin mutaciones.
+_JS_ESPERAR_GRILLA = """([selector, quietud, maximo, previo]) => new Promise(resolve => {
+    const inicio = performance.now();
+    let ultimoCambio = inicio;
+    const obs = new MutationObserver(() => { ultimoCambio = performance.now(); });
+    obs.observe(document.body, { childList: true, subtree: true, characterData: true });
+    const chequear = () => {
+        const els = document.querySelectorAll(selector);
+        const ahora = performance.now();
+        const cambio = previo === null || (els.length > 0 && els[0].innerText !== previo);
+        const listo = els.length > 0 && cambio && ahora - ultimoCambio >= quietud;
+        if (listo || ahora - inicio >= maximo) {
+            obs.disconnect();
+            resolve({ count: els.length, listo });
+        } else {
+            setTimeout(chequear, 100);
+        }
+    };
+    chequear();
+})"""
+
+_JS_SCROLL = """(paso) => {
+    window.scrollBy(0, paso);
+    return window.scrollY + window.innerHeight >= document.body.scrollHeight - 2;
+}"""
+
+
+async def _esperar_quietud(page, selector, quietud, restante, previo=None):
+    # Si hay una navegación en el medio se destruye el contexto JS: esperamos el DOM y reintentamos
+    limite = time.perf_counter() + restante
+    while True:
+        faltan = limite - time.perf_counter()
+        if faltan <= 0:
+            return {"count": 0, "listo": False}
+        try:
+            return await page.evaluate(_JS_ESPERAR_GRILLA, [selector, quietud * 1000, faltan * 1000, previo])
+        except Exception:
+            try:
+                await page.wait_for_load_state("domcontentloaded", timeout=faltan * 1000)
+            except Exception:
+                pass
+            await asyncio.sleep(0.1)
+
+
+async def esperar_grilla(page, selector, presupuesto, etiqueta="", quietud=0.5, previo=None, red_inactiva=False):
+    # Reemplaza los sleeps fijos: vuelve apenas la grilla está poblada y estable, o al agotar el presupuesto
+    inicio = time.perf_counter()
+
+    if red_inactiva:
+        try:
+            await page.wait_for_load_state("networkidle", timeout=presupuesto * 1000)
+        except Exception:
+            pass
+
+    restante = presupuesto - (time.perf_counter() - inicio)
+    resultado = await _esperar_quietud(page, selector, quietud, restante, previo)
+
+    duracion = time.perf_counter() - inicio
+    estado = "lista" if resultado["listo"] else "presupuesto agotado"
+    print(f"⏱️ [{etiqueta}] grilla {estado} en {duracion:.2f}s ({resultado['count']} elementos)")
+    return resultado["count"]
+
+
+async def scroll_hasta_estable(page, selector, presupuesto, etiqueta="", paso=1000, quietud=0.3):
+    # Reemplaza los scrolls con sleep: baja de a `paso` px y sigue mientras aparezcan elementos nuevos
+    inicio = time.perf_counter()
+    anterior = -1
+    count = 0
+
+    while time.perf_counter() - inicio < presupuesto:
+        al_fondo = await page.evaluate(_JS_SCROLL, paso)
+        restante = presupuesto - (time.perf_counter() - inicio)
+        count = (await _esperar_quietud(page, selector, quietud, restante))["count"]
+        if al_fondo and count == anterior:
+            break
+        anterior = count
+
+    duracion = time.perf_counter() - inicio
+    print(f"⏱️ [{etiqueta}] scroll estable en {duracion:.2f}s ({count} elementos)")
+    return count
+
+
+async def primer_texto(page, selector):
+    # Texto del primer elemento del selector, para detectar cuándo cambió la página tras un click
+    return await page.evaluate(
+        "(selector) => { const e = document.querySelector(selector); return e ? e.innerText : null; }",
+        selector,
+    )
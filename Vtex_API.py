@@ -0,0 +1,186 @@
+import os
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from Categorias import CATEGORIAS, CATEGORIA_DEFECTO, coincide
+
+# --- Tiendas VTEX: la búsqueda de cada categoría ("api": ruta + params) está en categorias.json ---
+TIENDAS_VTEX = {
+    "carrefour": "https://www.carrefour.com.ar",
+    "jumbo": "https://www.jumbo.com.ar",
+}
+
+TAMAÑO_PAGINA = 50   # máximo que acepta la API por pedido (_from/_to)
+MAX_RESULTADOS = 2500  # VTEX no deja paginar más allá
+HILOS = 4
+
+# Respuestas grabadas de la API (<tienda>_<categoria>.json) y los registros que deben salir de cada
+# una (<tienda>_<categoria>_esperado.json): --verificar comprueba parsear_productos sin red
+FIXTURES_VTEX_PATH = os.path.join("Data", "VTEX")
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36",
+    "Accept": "application/json",
+}
+
+
+def nueva_sesion():
+    # Sesión con pool de conexiones keep-alive, compartida por todos los pedidos de la corrida
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HILOS, pool_maxsize=HILOS, max_retries=2)
+    session.mount("https://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+def _pedir_pagina(session, tienda, api, desde):
+    params = dict(api["params"], _from=desde, _to=desde + TAMAÑO_PAGINA - 1)
+    response = session.get(TIENDAS_VTEX[tienda] + api["ruta"], params=params, timeout=20)
+    response.raise_for_status()
+    return response
+
+
+def buscar_productos(tienda, api, session=None):
+    # Devuelve el JSON crudo de todos los productos de la búsqueda (lista de dicts de VTEX)
+    session = session or nueva_sesion()
+
+    primera = _pedir_pagina(session, tienda, api, 0)
+    productos = primera.json()
+
+    # El header "resources" trae el total: "0-49/137"
+    total = len(productos)
+    recursos = primera.headers.get("resources", "")
+    if "/" in recursos:
+        total = min(int(recursos.split("/")[-1]), MAX_RESULTADOS)
+
+    desdes = range(TAMAÑO_PAGINA, total, TAMAÑO_PAGINA)
+    with ThreadPoolExecutor(max_workers=HILOS) as pool:
+        for response in pool.map(lambda d: _pedir_pagina(session, tienda, api, d), desdes):
+            productos.extend(response.json())
+
+    return productos
+
+
+def parsear_productos(productos_json, categoria, fecha_actual):
+    # Convierte el JSON de VTEX a registros {fecha, nombre, precio}; no toca la red
+    registros = []
+    vistos = set()
+    for producto in productos_json:
+        nombre = (producto.get("productName") or "").strip()
+        if not coincide(categoria, nombre) or nombre in vistos:
+            continue
+
+        precio = None
+        for item in producto.get("items", []):
+            for seller in item.get("sellers", []):
+                oferta = seller.get("commertialOffer", {})
+                if oferta.get("Price") and oferta.get("AvailableQuantity", 0) > 0:
+                    precio = oferta["Price"]
+                    break
+            if precio is not None:
+                break
+
+        if precio is None:
+            continue
+
+        vistos.add(nombre)
+        registros.append({
+            "fecha": fecha_actual,
+            "nombre": nombre,
+            "precio": float(precio),
+        })
+    return registros
+
+
+def verificar_fixtures(carpeta=FIXTURES_VTEX_PATH):
+    # Parsea cada respuesta grabada y la compara con sus registros esperados; devuelve cuántas fallaron
+    fallas = 0
+    for filename in sorted(os.listdir(carpeta)):
+        if not filename.endswith(".json") or filename.endswith("_esperado.json"):
+            continue
+        tienda, clave = filename[:-len(".json")].split("_", 1)
+        with open(os.path.join(carpeta, filename), encoding="utf-8") as f:
+            productos_json = json.load(f)
+        with open(os.path.join(carpeta, f"{tienda}_{clave}_esperado.json"), encoding="utf-8") as f:
+            esperados = json.load(f)
+
+        obtenidos = [{"nombre": r["nombre"], "precio": r["precio"]}
+                     for r in parsear_productos(productos_json, CATEGORIAS[clave], "fixture")]
+        if obtenidos == esperados:
+            print(f"✅ {filename}: {len(obtenidos)} registros como se esperaba")
+            continue
+        fallas += 1
+        print(f"❌ {filename}: los registros no coinciden")
+        for registro in obtenidos:
+            if registro not in esperados:
+                print(f"  + {registro}")
+        for registro in esperados:
+            if registro not in obtenidos:
+                print(f"  - {registro}")
+    return fallas
+
+
+def scrape_vtex(tienda, api, categoria, session=None):
+    fecha_actual = datetime.now().strftime('%Y-%m-%d')
+    productos_json = buscar_productos(tienda, api, session)
+    print(f"🌐 {tienda}/{categoria['clave']}: {len(productos_json)} productos desde la API de VTEX")
+    return parsear_productos(productos_json, categoria, fecha_actual)
+
+
+def scrape_vtex_categorias(tienda, seleccion):
+    # Corre la API para cada (categoría, búsqueda) con una sola sesión. Devuelve
+    # {clave: registros} solo de las categorías que funcionaron; el resto va por el navegador.
+    session = nueva_sesion()
+    resultados = {}
+    for categoria, busqueda in seleccion:
+        if "api" not in busqueda:
+            continue
+        try:
+            registros = scrape_vtex(tienda, busqueda["api"], categoria, session)
+        except Exception as e:
+            print(f"⚠️ Error en la API de VTEX para {categoria['clave']} ({e}), se usa el navegador")
+            continue
+        if registros:
+            resultados[categoria["clave"]] = registros
+        else:
+            print(f"⚠️ La API de VTEX no devolvió productos de {categoria['clave']}, se usa el navegador")
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backend HTTP/JSON para tiendas VTEX (Carrefour y Jumbo).")
+    parser.add_argument("tienda", nargs="?", choices=list(TIENDAS_VTEX))
+    parser.add_argument("--categoria", choices=list(CATEGORIAS), default=CATEGORIA_DEFECTO)
+    parser.add_argument("--grabar", metavar="JSON", help="Guarda la respuesta cruda de la API en este archivo")
+    parser.add_argument("--fixture", metavar="JSON", help="Parsea un JSON grabado en lugar de ir a la red")
+    parser.add_argument("--verificar", action="store_true",
+                        help=f"Compara el parseo de las respuestas grabadas en {FIXTURES_VTEX_PATH} con los registros esperados")
+    args = parser.parse_args()
+
+    if args.verificar:
+        raise SystemExit(1 if verificar_fixtures() else 0)
+    if args.tienda is None:
+        parser.error("falta la tienda (o --verificar)")
+
+    categoria = CATEGORIAS[args.categoria]
+    fecha_actual = datetime.now().strftime('%Y-%m-%d')
+
+    if args.fixture:
+        with open(args.fixture, encoding="utf-8") as f:
+            productos_json = json.load(f)
+    else:
+        productos_json = buscar_productos(args.tienda, categoria["busquedas"][args.tienda]["api"])
+        if args.grabar:
+            with open(args.grabar, "w", encoding="utf-8") as f:
+                json.dump(productos_json, f, ensure_ascii=False)
+            print(f"📁 Respuesta guardada en: {args.grabar}")
+
+    resultados = parsear_productos(productos_json, categoria, fecha_actual)
+    print(f"\n✅ Se encontraron {len(resultados)} productos de {categoria['nombre']}.")
+    for r in resultados:
+        print(f"  {r['nombre']}: {r['precio']}")